@@ -0,0 +1,206 @@
+"""
+Нагрузочный тест диспетчера: настоящий Dispatcher со всеми роутерами из main.py,
+синтетические апдейты типовых сценариев, Bot API заглушен (StubSession или benchmarks.fake_telegram),
+БД - локальный Postgres из .env.
+
+Сценарии:
+    browse     - список дат и события на дату
+    event      - карточка события
+    pay        - карточка события и счет на оплату
+    team       - карточка команды и запрос на вступление капитану
+    tournament - карточка турнира
+
+Запуск из корня проекта: python -m benchmarks.dispatcher_load --updates 2000 --concurrency 20
+С --fast используются uvloop и orjson (JSON сериализуется только с --api-server), сравнение: benchmarks.fast_runtime
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import random
+import time
+from collections import defaultdict
+from typing import Any
+
+import asyncpg
+import numpy as np
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+import main
+import runtime
+from benchmarks.fake_telegram import create_fake_bot
+from benchmarks.stub_bot import create_stub_bot
+from database.database import close_pg_pool
+from settings import settings
+
+FLOWS = ("browse", "event", "pay", "team", "tournament")
+
+
+class Dataset:
+    """Идентификаторы из БД, по которым строятся апдейты"""
+    def __init__(self, users: list, events: list, tournaments: list, teams: list):
+        self.users = users
+        self.events = events
+        self.tournaments = tournaments
+        self.teams = teams
+
+
+async def load_dataset(limit: int) -> Dataset:
+    conn = await asyncpg.connect(
+        user=settings.db.postgres_user,
+        host=settings.db.postgres_host,
+        password=settings.db.postgres_password,
+        port=settings.db.postgres_port,
+        database=settings.db.postgres_db
+    )
+    try:
+        users = await conn.fetch(
+            "SELECT id, tg_id FROM users WHERE tg_id ~ '^[0-9]+$' AND level IS NOT NULL AND gender IS NOT NULL "
+            "ORDER BY random() LIMIT $1", limit
+        )
+        events = await conn.fetch("SELECT id, date FROM events WHERE active = true ORDER BY random() LIMIT $1", limit)
+        tournaments = await conn.fetch("SELECT id FROM tournaments WHERE active = true ORDER BY random() LIMIT $1",
+                                       limit)
+        teams = await conn.fetch(
+            "SELECT teams.id, teams.tournament_id FROM teams JOIN tournaments ON tournaments.id = teams.tournament_id "
+            "WHERE tournaments.active = true ORDER BY random() LIMIT $1", limit
+        )
+    finally:
+        await conn.close()
+
+    if not users:
+        raise SystemExit("В БД нет пользователей с уровнем и полом, заполните БД тестовыми данными")
+    return Dataset(list(users), list(events), list(tournaments), list(teams))
+
+
+def flow_callbacks(flow: str, user: Any, dataset: Dataset, rnd: random.Random) -> list[str]:
+    """callback_data для шагов сценария"""
+    if flow == "browse":
+        steps = ["menu_all-events"]
+        if dataset.events:
+            steps.append(f"events-date_{rnd.choice(dataset.events)['date'].strftime('%d.%m.%Y')}")
+        return steps
+    if flow == "event" and dataset.events:
+        return [f"user-event_{rnd.choice(dataset.events)['id']}"]
+    if flow == "pay" and dataset.events:
+        event_id = rnd.choice(dataset.events)["id"]
+        return [f"user-event_{event_id}", f"reg-user_{event_id}_{user['id']}"]
+    if flow == "team" and dataset.teams:
+        team = rnd.choice(dataset.teams)
+        return [f"register-in-team_{team['id']}_{team['tournament_id']}_mm",
+                f"reg-user-in-team_{team['id']}_{team['tournament_id']}"]
+    if flow == "tournament" and dataset.tournaments:
+        return [f"user-tournament_{rnd.choice(dataset.tournaments)['id']}"]
+    return []
+
+
+_update_ids = itertools.count(1)
+
+
+def callback_update(tg_id: int, data: str) -> Update:
+    """Нажатие inline кнопки под сообщением бота"""
+    user = {"id": tg_id, "is_bot": False, "first_name": "Load", "last_name": "Test"}
+    update_id = next(_update_ids)
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(tg_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(datetime.datetime.now().timestamp()),
+                "chat": {"id": tg_id, "type": "private"},
+                "from": {"id": 42, "is_bot": True, "first_name": "bot"},
+                "text": "...",
+            },
+        },
+    })
+
+
+async def run(dispatcher: Dispatcher, bot: Bot, dataset: Dataset, flows: list[str], updates: int,
+              concurrency: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    sent = 0
+
+    # сценарии одного пользователя выполняются последовательно, как нажатия кнопок
+    queue: asyncio.Queue = asyncio.Queue()
+    while sent < updates:
+        user = rnd.choice(dataset.users)
+        callbacks = flow_callbacks(rnd.choice(flows), user, dataset, rnd)
+        if not callbacks:
+            continue
+        queue.put_nowait((int(user["tg_id"]), callbacks))
+        sent += len(callbacks)
+
+    async def worker():
+        while not queue.empty():
+            tg_id, callbacks = queue.get_nowait()
+            for data in callbacks:
+                prefix = data.split("_")[0]
+                start = time.perf_counter()
+                try:
+                    await dispatcher.feed_update(bot, callback_update(tg_id, data))
+                except Exception:
+                    errors[prefix] += 1
+                latencies[prefix].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"Апдейтов: {total}, параллельность: {concurrency}, время: {elapsed:.2f} s, "
+          f"{total / elapsed:.1f} апдейтов/с")
+    print(f"{'prefix':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for prefix, values in sorted(latencies.items()):
+        p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+        print(f"{prefix:<20}{len(values):>8}{errors[prefix]:>8}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+
+    calls = getattr(bot.session, "calls", None)
+    if calls is not None:
+        print("Вызовы Bot API: " + ", ".join(f"{name}={count}" for name, count in calls.most_common()))
+
+
+async def amain(args: argparse.Namespace) -> None:
+    dataset = await load_dataset(args.sample)
+    json_loads, json_dumps = runtime.json_functions(args.fast)
+    bot = create_fake_bot(args.api_server, json_loads=json_loads, json_dumps=json_dumps) if args.api_server \
+        else create_stub_bot(latency=args.api_latency / 1000)
+    dispatcher = main.create_dispatcher(AsyncIOScheduler(timezone="Europe/Moscow"))
+    try:
+        await run(dispatcher, bot, dataset, args.flows, args.updates, args.concurrency, args.seed)
+    finally:
+        await bot.session.close()
+        await close_pg_pool()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--flows", type=lambda value: value.split(","), default=list(FLOWS),
+                        help=f"через запятую из {','.join(FLOWS)}")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка ответа Bot API, мс")
+    parser.add_argument("--api-server", default=None,
+                        help="адрес benchmarks.fake_telegram, по умолчанию Bot API заглушен без сети")
+    parser.add_argument("--sample", type=int, default=1000, help="сколько id каждого вида брать из БД")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fast", action="store_true", help="uvloop и orjson (как settings.fast_runtime)")
+    args = parser.parse_args()
+
+    unknown = set(args.flows) - set(FLOWS)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {unknown}")
+    return args
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    print(f"Event loop: {runtime.install_event_loop(arguments.fast)}")
+    asyncio.run(amain(arguments))
@@ -0,0 +1,212 @@
+"""
+Локальная замена Telegram Bot API на aiohttp для интеграционных и нагрузочных тестов.
+
+Записывает все вызовы, добавляет задержку ответа и может возвращать ошибки:
+    429 Too Many Requests (retry_after), 403 bot was blocked by the user,
+    400 message is not modified (для editMessage*).
+
+Бот подключается через settings.bot_api_server (или create_fake_bot).
+
+Отдельный запуск: python -m benchmarks.fake_telegram --port 8081 --latency 50 --rate-429 0.01
+Записанные вызовы: GET /calls, сброс: DELETE /calls
+"""
+import argparse
+import asyncio
+import datetime
+import inspect
+import itertools
+import random
+import time
+import typing
+from typing import Any
+
+from aiogram import Bot, methods
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+from aiogram.types import Message, User
+from aiohttp import web
+
+# api метод -> тип результата, берется из классов методов aiogram
+RETURNING: dict[str, Any] = {
+    cls.__api_method__: cls.__returning__
+    for cls in vars(methods).values()
+    if inspect.isclass(cls) and issubclass(cls, methods.TelegramMethod) and hasattr(cls, "__api_method__")
+}
+
+
+class Call(typing.NamedTuple):
+    """Записанный вызов Bot API"""
+    method: str
+    params: dict[str, Any]
+    status: int
+    at: float
+
+
+class FakeTelegram:
+    """Сервер, отвечающий на запросы Bot API вместо Telegram"""
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_429: float = 0.0, retry_after: int = 1,
+                 rate_403: float = 0.0, rate_not_modified: float = 0.0, blocked_chats: set[int] | None = None,
+                 seed: int | None = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rate_403 = rate_403
+        self.rate_not_modified = rate_not_modified
+        self.blocked_chats = blocked_chats or set()
+        self.calls: list[Call] = []
+        self._random = random.Random(seed)
+        self._message_ids = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self._handle_method)
+        self.app.router.add_get("/calls", self._handle_calls)
+        self.app.router.add_delete("/calls", self._handle_reset)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запуск сервера, возвращает базовый url для TelegramAPIServer.from_base"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeTelegram":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    def calls_of(self, method: str) -> list[Call]:
+        return [call for call in self.calls if call.method == method]
+
+    def reset(self) -> None:
+        self.calls.clear()
+
+    async def _handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await self._read_params(request)
+
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        status, payload = self._response(method, params)
+        self.calls.append(Call(method, params, status, time.time()))
+        return web.json_response(payload, status=status)
+
+    async def _handle_calls(self, request: web.Request) -> web.Response:
+        return web.json_response([
+            {"method": call.method, "params": call.params, "status": call.status, "at": call.at}
+            for call in self.calls
+        ])
+
+    async def _handle_reset(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({"ok": True})
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> dict[str, Any]:
+        if request.content_type == "application/json":
+            return await request.json()
+
+        params = {}
+        for key, value in (await request.post()).items():
+            # загружаемые файлы записываем только по имени
+            params[key] = getattr(value, "filename", value)
+        return params
+
+    def _response(self, method: str, params: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        chat_id = params.get("chat_id")
+
+        if self.rate_429 and self._random.random() < self.rate_429:
+            return 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+
+        if chat_id is not None and (int(chat_id) in self.blocked_chats or
+                                    (self.rate_403 and self._random.random() < self.rate_403)):
+            return 403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+
+        if method.startswith("editMessage") and self.rate_not_modified and \
+                self._random.random() < self.rate_not_modified:
+            return 400, {
+                "ok": False,
+                "error_code": 400,
+                "description": "Bad Request: message is not modified: specified new message content and reply "
+                               "markup are exactly the same as a current content and reply markup of the message",
+            }
+
+        return 200, {"ok": True, "result": self._result(method, params)}
+
+    def _result(self, method: str, params: dict[str, Any]) -> Any:
+        returning = RETURNING.get(method, bool)
+        returning_types = typing.get_args(returning) or (returning,)
+
+        if Message in returning_types:
+            chat_id = int(params.get("chat_id") or 1)
+            message_id = params.get("message_id") or next(self._message_ids)
+            return {
+                "message_id": int(message_id),
+                "date": int(datetime.datetime.now().timestamp()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": 42, "is_bot": True, "first_name": "fake"},
+                "text": params.get("text"),
+            }
+        if User in returning_types:
+            return {"id": 42, "is_bot": True, "first_name": "fake", "username": "fake_bot"}
+        if typing.get_origin(returning) is list:
+            return []
+        return True
+
+
+def create_fake_bot(url: str, token: str = "42:FAKE", **session_kwargs: Any) -> Bot:
+    """Bot, который отправляет запросы на FakeTelegram"""
+    session = AiohttpSession(api=TelegramAPIServer.from_base(url), **session_kwargs)
+    return Bot(token, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+
+async def amain(args: argparse.Namespace) -> None:
+    server = FakeTelegram(latency=args.latency / 1000, jitter=args.jitter / 1000, rate_429=args.rate_429,
+                          retry_after=args.retry_after, rate_403=args.rate_403,
+                          rate_not_modified=args.rate_not_modified, seed=args.seed)
+    url = await server.start(args.host, args.port)
+    print(f"Fake Bot API: {url} (settings.bot_api_server={url})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, мс")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, мс")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--rate-403", type=float, default=0.0, help="доля ответов 403 (бот заблокирован)")
+    parser.add_argument("--rate-not-modified", type=float, default=0.0,
+                        help="доля ответов message is not modified на editMessage*")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(amain(parse_args()))
@@ -0,0 +1,117 @@
+"""
+Сравнение стандартного runtime и settings.fast_runtime (uvloop + orjson).
+
+1. Сериализация запросов и разбор ответов Bot API сессией aiogram (json против orjson), без сети и БД.
+2. benchmarks.dispatcher_load с benchmarks.fake_telegram дважды - без --fast и с --fast
+   (отдельные процессы, т.к. event loop выбирается при запуске). Нужен локальный Postgres, --skip-dispatcher пропускает.
+
+Запуск из корня проекта: python -m benchmarks.fast_runtime --updates 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import re
+import statistics
+import sys
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+import runtime
+from benchmarks.fake_telegram import FakeTelegram
+
+
+def sample_request() -> SendMessage:
+    """Типовое сообщение бота: карточка события с клавиатурой"""
+    buttons = [[InlineKeyboardButton(text=f"🏐 Игра {i} | 19:00 | 12/16", callback_data=f"menu-join-event_{i}")]
+               for i in range(20)]
+    return SendMessage(chat_id=123456789, text="<b>Событие</b>\n" + "Участники: Иван Иванов\n" * 16,
+                       reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
+
+
+def sample_response(method: SendMessage) -> str:
+    return json.dumps({"ok": True, "result": {
+        "message_id": 1, "date": int(datetime.datetime.now().timestamp()), "text": method.text,
+        "chat": {"id": method.chat_id, "type": "private"},
+        "from": {"id": 42, "is_bot": True, "first_name": "bot"},
+        "reply_markup": method.reply_markup.model_dump(exclude_none=True),
+    }}, ensure_ascii=False)
+
+
+def bench_json(iterations: int, rounds: int) -> None:
+    bot = Bot("42:FAKE")
+    method = sample_request()
+    content = sample_response(method)
+
+    sessions = {}
+    for name, fast in (("json", False), ("orjson", True)):
+        json_loads, json_dumps = runtime.json_functions(fast)
+        sessions[name] = AiohttpSession(json_loads=json_loads, json_dumps=json_dumps)
+
+    # варианты чередуются по раундам, чтобы фоновая нагрузка машины влияла на оба одинаково
+    results: dict[str, list[float]] = {name: [] for name in sessions}
+    for _ in range(rounds):
+        for name, session in sessions.items():
+            start = time.perf_counter()
+            for _ in range(iterations):
+                session.build_form_data(bot, method)
+                session.check_response(bot, method, 200, content)
+            results[name].append((time.perf_counter() - start) / iterations)
+
+    medians = {name: statistics.median(values) for name, values in results.items()}
+    print(f"Запрос + ответ Bot API ({iterations} раз x {rounds} раундов, медиана):")
+    for name, elapsed in medians.items():
+        print(f"  {name:<8}{elapsed * 1_000_000:>10.1f} мкс")
+    print(f"  ускорение: {medians['json'] / medians['orjson']:.2f}x\n")
+
+
+async def run_dispatcher_load(url: str, fast: bool, args: argparse.Namespace) -> float:
+    command = [sys.executable, "-m", "benchmarks.dispatcher_load", "--api-server", url,
+               "--updates", str(args.updates), "--concurrency", str(args.concurrency)]
+    if fast:
+        command.append("--fast")
+
+    process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE)
+    output = (await process.stdout.read()).decode()
+    await process.wait()
+    print(output)
+
+    match = re.search(r"([\d.]+) апдейтов/с", output)
+    if process.returncode or not match:
+        raise SystemExit(f"dispatcher_load завершился с кодом {process.returncode}")
+    return float(match.group(1))
+
+
+async def bench_dispatcher(args: argparse.Namespace) -> None:
+    server = FakeTelegram(latency=args.api_latency / 1000)
+    url = await server.start()
+    try:
+        default = await run_dispatcher_load(url, False, args)
+        fast = await run_dispatcher_load(url, True, args)
+    finally:
+        await server.stop()
+
+    print(f"Пропускная способность: asyncio + json {default:.1f} апдейтов/с, "
+          f"fast runtime {fast:.1f} апдейтов/с ({fast / default:.2f}x)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=9, help="чередующихся раундов json/orjson")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка ответа fake Bot API, мс")
+    parser.add_argument("--skip-dispatcher", action="store_true", help="только сравнение JSON, без БД")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    bench_json(arguments.iterations, arguments.rounds)
+    if not arguments.skip_dispatcher:
+        asyncio.run(bench_dispatcher(arguments))
@@ -0,0 +1,227 @@
+"""
+Генерация синтетических данных для нагрузочных тестов и бенчмарков (загрузка через COPY).
+
+Заполняет users, events, events_users, reserved, payments, tournaments, teams, teams_users, tournament_payments.
+Уровни и пол игроков распределены по ключам settings.user_points, состав команд ограничен
+баллами уровня турнира (settings.tournament_points). Даты событий и турниров - от --days-back дней назад
+до --days-ahead дней вперед, прошедшие неактивны.
+
+Данные добавляются к существующим (id продолжают последовательности), --truncate предварительно очищает таблицы.
+
+Запуск из корня проекта:
+    python -m benchmarks.generate_data --users 100000 --events 5000 --tournaments 1000 --teams 30
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import time
+
+import asyncpg
+
+from settings import settings
+
+TABLES = ("users", "events", "events_users", "reserved", "payments", "tournaments", "teams", "teams_users",
+          "tournament_payments")
+
+# доля игроков каждого уровня (уровень None - новый пользователь, которого еще не оценили)
+LEVEL_WEIGHTS = {None: 0.08, 1: 0.14, 2: 0.18, 3: 0.22, 4: 0.17, 5: 0.11, 6: 0.07, 7: 0.03}
+GENDER_WEIGHTS = {"male": 0.6, "female": 0.36, None: 0.04}
+
+EVENT_TYPES = ("Игра", "Тренировка", "Мини-турнир")
+TITLES = ("Вечерняя игра", "Игра выходного дня", "Утренняя тренировка", "Сборная игра", "Пляжный волейбол")
+FIRSTNAMES = ("Иван", "Мария", "Алексей", "Анна", "Дмитрий", "Елена", "Сергей", "Ольга", "Павел", "Наталья")
+LASTNAMES = ("Иванов", "Смирнова", "Кузнецов", "Попова", "Соколов", "Лебедева", "Козлов", "Новикова")
+
+
+async def next_id(conn: asyncpg.Connection, table: str) -> int:
+    return await conn.fetchval(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")
+
+
+def weighted(rnd: random.Random, weights: dict, count: int) -> list:
+    return rnd.choices(list(weights), weights=list(weights.values()), k=count)
+
+
+def generate_users(rnd: random.Random, first_id: int, count: int) -> list[tuple]:
+    levels = weighted(rnd, LEVEL_WEIGHTS, count)
+    genders = weighted(rnd, GENDER_WEIGHTS, count)
+    users = []
+    for i in range(count):
+        user_id = first_id + i
+        gender = genders[i]
+        level = levels[i]
+        # уровни берутся из таблицы баллов settings.user_points
+        if level is not None and gender is not None and level not in settings.user_points[gender]:
+            level = max(settings.user_points[gender])
+        users.append((user_id, str(10_000_000_000 + user_id), f"load_{user_id}", rnd.choice(FIRSTNAMES),
+                      rnd.choice(LASTNAMES), level, gender))
+    return users
+
+
+def random_date(rnd: random.Random, now: datetime.datetime, days_back: int, days_ahead: int) -> datetime.datetime:
+    day = now.date() + datetime.timedelta(days=rnd.randint(-days_back, days_ahead))
+    return datetime.datetime.combine(day, datetime.time(hour=rnd.choice((9, 11, 18, 19, 20, 21))))
+
+
+def generate_events(rnd: random.Random, first_id: int, count: int, users: list[tuple], first_payment_id: int,
+                    first_reserved_id: int, now: datetime.datetime, days_back: int, days_ahead: int) -> dict:
+    events, events_users, payments, reserved = [], [], [], []
+    payment_id, reserved_id = first_payment_id, first_reserved_id
+    user_ids = [user[0] for user in users]
+
+    for i in range(count):
+        event_id = first_id + i
+        date = random_date(rnd, now, days_back, days_ahead)
+        places = rnd.choice((12, 14, 16, 18, 24))
+        events.append((event_id, rnd.choice(EVENT_TYPES), rnd.choice(TITLES), date, places, places // 2,
+                       date > now - datetime.timedelta(hours=1), rnd.randint(1, 6), rnd.choice((500, 600, 700, 800))))
+
+        # заполненность события, у заполненных есть резерв
+        registered = min(places, int(places * rnd.uniform(0.3, 1.0) + 0.5))
+        reserve_count = rnd.randint(1, 6) if registered == places and rnd.random() < 0.5 else 0
+        chosen = rnd.sample(user_ids, registered + reserve_count)
+
+        for user_id in chosen[:registered]:
+            events_users.append((user_id, event_id))
+            payments.append((payment_id, True, rnd.random() < 0.9, event_id, user_id))
+            payment_id += 1
+
+        for position, user_id in enumerate(chosen[registered:]):
+            reserved.append((reserved_id, date - datetime.timedelta(days=3) + datetime.timedelta(minutes=position),
+                             user_id, event_id))
+            payments.append((payment_id, True, rnd.random() < 0.5, event_id, user_id))
+            reserved_id += 1
+            payment_id += 1
+
+    return {"events": events, "events_users": events_users, "payments": payments, "reserved": reserved}
+
+
+def generate_tournaments(rnd: random.Random, first_id: int, count: int, teams_per_tournament: int,
+                         users: list[tuple], first_team_id: int, first_payment_id: int, now: datetime.datetime,
+                         days_back: int, days_ahead: int) -> dict:
+    tournaments, teams, teams_users, payments = [], [], [], []
+    team_id, payment_id = first_team_id, first_payment_id
+
+    # игроки с уровнем и полом, подходящие для турнира каждого уровня
+    eligible: dict[int, list[tuple]] = {
+        level: [user for user in users if user[5] is not None and user[6] is not None and user[5] <= level]
+        for level in settings.tournament_points
+    }
+
+    for i in range(count):
+        tournament_id = first_id + i
+        level = rnd.choice(list(settings.tournament_points))
+        date = random_date(rnd, now, days_back, days_ahead)
+        max_team_count = max(1, int(teams_per_tournament * 0.8))
+        tournaments.append((tournament_id, "Турнир", f"{settings.tournament_points[level][0]} #{tournament_id}", date,
+                            max_team_count, max(1, max_team_count // 2), 6, 8, date > now - datetime.timedelta(hours=1),
+                            level, rnd.choice((3000, 3500, 4000))))
+
+        # в турнире игрок состоит только в одной команде
+        candidates = rnd.sample(eligible[level], min(len(eligible[level]), teams_per_tournament * 16))
+        max_points = settings.tournament_points[level][1]
+        created_at = date - datetime.timedelta(days=30)
+
+        for team_number in range(teams_per_tournament):
+            # набираем игроков, пока хватает баллов уровня турнира
+            members, skipped, points, team_size = [], [], 0, rnd.randint(6, 8)
+            while candidates and len(members) < team_size and len(skipped) < 20:
+                user = candidates.pop()
+                user_points = settings.user_points[user[6]][user[5]]
+                if points + user_points > max_points:
+                    skipped.append(user)
+                    continue
+                members.append(user[0])
+                points += user_points
+            # не поместившиеся по баллам игроки достаются другим командам
+            candidates[:0] = skipped
+            if len(members) < 6:
+                break
+
+            libero_id = rnd.choice(members) if rnd.random() < 0.3 else None
+            teams.append((team_id, f"Команда {team_id}", members[0], libero_id, team_number >= max_team_count,
+                          created_at + datetime.timedelta(hours=team_number), tournament_id))
+            teams_users.extend((user_id, team_id) for user_id in members)
+
+            if rnd.random() < 0.7:
+                confirmed = rnd.random() < 0.6
+                paid_at = created_at + datetime.timedelta(days=1)
+                payments.append((payment_id, True, confirmed, paid_at,
+                                 paid_at + datetime.timedelta(hours=5) if confirmed else None, tournament_id, team_id))
+                payment_id += 1
+            team_id += 1
+
+    return {"tournaments": tournaments, "teams": teams, "teams_users": teams_users, "tournament_payments": payments}
+
+
+COLUMNS = {
+    "users": ("id", "tg_id", "username", "firstname", "lastname", "level", "gender"),
+    "events": ("id", "type", "title", "date", "places", "min_user_count", "active", "level", "price"),
+    "events_users": ("user_id", "event_id"),
+    "payments": ("id", "paid", "paid_confirm", "event_id", "user_id"),
+    "reserved": ("id", "date", "user_id", "event_id"),
+    "tournaments": ("id", "type", "title", "date", "max_team_count", "min_team_count", "min_team_players",
+                    "max_team_players", "active", "level", "price"),
+    "teams": ("id", "title", "team_leader_id", "team_libero_id", "reserve", "created_at", "tournament_id"),
+    "teams_users": ("user_id", "team_id"),
+    "tournament_payments": ("id", "paid", "paid_confirm", "paid_at", "confirmed_at", "tournament_id", "team_id"),
+}
+
+
+async def generate(args: argparse.Namespace) -> None:
+    rnd = random.Random(args.seed)
+    now = datetime.datetime.now()
+    conn = await asyncpg.connect(
+        user=settings.db.postgres_user,
+        host=settings.db.postgres_host,
+        password=settings.db.postgres_password,
+        port=settings.db.postgres_port,
+        database=settings.db.postgres_db
+    )
+    try:
+        if args.truncate:
+            await conn.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+
+        start = time.perf_counter()
+        users = generate_users(rnd, await next_id(conn, "users"), args.users)
+        data = {"users": users}
+        data.update(generate_events(rnd, await next_id(conn, "events"), args.events, users,
+                                    await next_id(conn, "payments"), await next_id(conn, "reserved"), now,
+                                    args.days_back, args.days_ahead))
+        data.update(generate_tournaments(rnd, await next_id(conn, "tournaments"), args.tournaments, args.teams, users,
+                                         await next_id(conn, "teams"), await next_id(conn, "tournament_payments"),
+                                         now, args.days_back, args.days_ahead))
+        print(f"Сгенерировано за {time.perf_counter() - start:.1f} s")
+
+        # порядок таблиц учитывает внешние ключи
+        async with conn.transaction():
+            for table in TABLES:
+                start = time.perf_counter()
+                await conn.copy_records_to_table(table, records=data[table], columns=COLUMNS[table])
+                print(f"{table:<20}{len(data[table]):>10} строк  {time.perf_counter() - start:.1f} s")
+
+            for table in TABLES:
+                if "id" in COLUMNS[table]:
+                    await conn.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                       f"(SELECT max(id) FROM {table}))")
+
+        await conn.execute(f"ANALYZE {', '.join(TABLES)}")
+    finally:
+        await conn.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=5_000)
+    parser.add_argument("--tournaments", type=int, default=1_000)
+    parser.add_argument("--teams", type=int, default=30, help="команд на турнир")
+    parser.add_argument("--days-back", type=int, default=30)
+    parser.add_argument("--days-ahead", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы перед загрузкой")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(generate(parse_args()))
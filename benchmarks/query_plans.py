@@ -0,0 +1,145 @@
+"""
+Проверка планов горячих запросов AsyncOrm через EXPLAIN (FORMAT JSON).
+
+Каждый метод вызывается на данных из локальной БД (заполните ее через benchmarks.generate_data),
+выполненные им запросы перехватываются (database.query_stats) и отправляются в EXPLAIN с теми же параметрами.
+Проверка не проходит, если в плане есть Seq Scan по большой таблице (больше --large-rows строк),
+стоимость плана выше бюджета или у метода не перехвачено ни одного запроса.
+
+Запуск из корня проекта: python -m benchmarks.query_plans --large-rows 10000
+Завершается с кодом 1 при нарушениях. Та же проверка с параметрами по умолчанию - tests/test_query_plans.py
+(пропускается без Postgres или без сгенерированных данных).
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, Awaitable, Callable
+
+from database.database import pg_connection, close_pg_pool
+from database.orm import AsyncOrm
+from database.query_stats import track_queries
+
+# таблица считается большой от этого числа строк (--large-rows)
+LARGE_ROWS = 10_000
+# бюджет стоимости плана по умолчанию (--max-cost)
+MAX_COST = 5_000
+# бюджет стоимости плана (total cost) по методам, для остальных --max-cost
+COST_BUDGETS: dict[str, float] = {
+    "get_events": 20_000,
+}
+
+
+async def sample_args(session: Any) -> dict[str, Any]:
+    """Параметры для методов: событие с резервом, турнир с командами, игрок команды"""
+    event_id = await session.fetchval(
+        "SELECT event_id FROM reserved JOIN events ON events.id = reserved.event_id "
+        "WHERE events.active = true LIMIT 1"
+    ) or await session.fetchval("SELECT id FROM events WHERE active = true LIMIT 1")
+    payment = await session.fetchrow(
+        "SELECT event_id, user_id, tg_id FROM payments JOIN users ON users.id = payments.user_id "
+        "WHERE event_id = $1 LIMIT 1", event_id
+    )
+    team = await session.fetchrow(
+        "SELECT teams.tournament_id, teams_users.user_id FROM teams "
+        "JOIN teams_users ON teams_users.team_id = teams.id "
+        "JOIN tournaments ON tournaments.id = teams.tournament_id "
+        "WHERE tournaments.active = true LIMIT 1"
+    )
+    if not event_id or not payment or not team:
+        raise SystemExit("В БД недостаточно данных, заполните ее: python -m benchmarks.generate_data")
+
+    return {"event_id": event_id, "payment_event_id": payment["event_id"], "payment_user_id": payment["user_id"],
+            "payment_user_tg_id": payment["tg_id"],
+            "tournament_id": team["tournament_id"], "team_user_id": team["user_id"]}
+
+
+def hot_queries(args: dict[str, Any], session: Any) -> dict[str, Callable[[], Awaitable[Any]]]:
+    return {
+        "get_events": lambda: AsyncOrm.get_events(only_active=True, days_ahead=11),
+        "get_teams_with_users": lambda: AsyncOrm.get_teams_with_users(args["tournament_id"], session),
+        "get_tournament_for_user": lambda: AsyncOrm.get_tournament_for_user(args["team_user_id"], session),
+        "get_payment_by_event_and_user": lambda: AsyncOrm.get_payment_by_event_and_user(
+            args["payment_event_id"], args["payment_user_id"]),
+        "get_reserved_users_by_event_id": lambda: AsyncOrm.get_reserved_users_by_event_id(args["event_id"]),
+        "get_my_events": lambda: AsyncOrm.get_my_events(args["payment_user_tg_id"], session),
+    }
+
+
+def walk(plan: dict) -> list[dict]:
+    """Все узлы плана"""
+    nodes = [plan]
+    for child in plan.get("Plans", []):
+        nodes.extend(walk(child))
+    return nodes
+
+
+async def large_tables(session: Any, large_rows: int) -> set[str]:
+    rows = await session.fetch(
+        "SELECT relname FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace "
+        "AND reltuples > $1", large_rows
+    )
+    return {row["relname"] for row in rows}
+
+
+async def find_violations(large_rows: int, max_cost: float, verbose: bool = False) -> list[str]:
+    """Нарушения планов горячих запросов, план каждого запроса печатается"""
+    violations = []
+    try:
+        async with pg_connection() as session:
+            params = await sample_args(session)
+            large = await large_tables(session, large_rows)
+            print(f"Большие таблицы (> {large_rows} строк): {', '.join(sorted(large)) or '-'}\n")
+
+            for name, run in hot_queries(params, session).items():
+                with track_queries(name, capture=True) as stats:
+                    await run()
+
+                if not stats.statements:
+                    violations.append(f"{name}: не перехвачено ни одного запроса")
+                    print(f"[FAIL] {name}: запросы не перехвачены")
+                    continue
+
+                budget = COST_BUDGETS.get(name, max_cost)
+                for query, query_args, _ in stats.statements:
+                    raw = await session.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *query_args)
+                    plan = json.loads(raw)[0]["Plan"]
+                    cost = plan["Total Cost"]
+                    seq_scans = sorted({node["Relation Name"] for node in walk(plan)
+                                        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in large})
+
+                    status = "ok"
+                    if seq_scans:
+                        status = "FAIL"
+                        violations.append(f"{name}: Seq Scan по {', '.join(seq_scans)}")
+                    if cost > budget:
+                        status = "FAIL"
+                        violations.append(f"{name}: стоимость {cost:.0f} больше бюджета {budget:.0f}")
+
+                    print(f"[{status}] {name}: cost {cost:.1f}, seq scan: {', '.join(seq_scans) or '-'}")
+                    if verbose or status != "ok":
+                        print("    " + " ".join(query.split()))
+    finally:
+        await close_pg_pool()
+    return violations
+
+
+async def check(args: argparse.Namespace) -> int:
+    violations = await find_violations(args.large_rows, args.max_cost, args.verbose)
+    if violations:
+        print("\nНарушения:")
+        print("\n".join(violations))
+        return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--large-rows", type=int, default=LARGE_ROWS, help="таблица считается большой от этого числа строк")
+    parser.add_argument("--max-cost", type=float, default=MAX_COST, help="бюджет стоимости плана по умолчанию")
+    parser.add_argument("--verbose", action="store_true", help="печатать текст всех запросов")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(check(parse_args())))
@@ -0,0 +1,192 @@
+"""
+Бенчмарк задач планировщика на синтетических данных растущего объема.
+
+Для каждого масштаба БД пересоздается через benchmarks.generate_data (таблицы очищаются!),
+затем задачи из routers.apsched выполняются со StubSession вместо Telegram.
+Замеряются время, количество SQL запросов (database.query_stats) и отправленные сообщения.
+Разовые задачи событий и турниров запускаются для выборки id, результат приводится на один запуск.
+
+Бенчмарк завершается с кодом 1, если количество запросов задачи растет вместе с количеством событий/турниров
+или задача не выполнила ни одного запроса (значит запросы не учитываются и проверка роста ничего не значит).
+
+Запуск из корня проекта (только на локальной БД):
+    python -m benchmarks.scheduler_jobs --truncate --scales 0.02,0.1,0.3
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Any, Awaitable, Callable
+
+from benchmarks import generate_data
+from benchmarks.stub_bot import create_stub_bot
+from database.database import pg_connection, close_pg_pool
+from database.query_stats import track_queries
+from routers import apsched
+
+BASE_SCALE = {"users": 100_000, "events": 5_000, "tournaments": 1_000, "teams": 30}
+
+
+async def _daily(func: Callable[[Any], Awaitable[Any]]) -> None:
+    async with pg_connection() as session:
+        await func(session)
+
+
+# задачи в порядке запуска: сначала читающие, затем меняющие данные
+DAILY_JOBS: dict[str, Callable[[Any], Awaitable[Any]]] = {
+    "notify_users_about_events": lambda bot: _daily(lambda s: apsched.notify_users_about_events(bot, s)),
+    "check_team_payment_for_tournament": lambda bot: _daily(lambda s: apsched.check_team_payment_for_tournament(s, bot)),
+    "check_min_players_in_team": lambda bot: _daily(lambda s: apsched.check_min_players_in_team(bot, s)),
+    "kick_from_tournaments_by_payments": lambda bot: apsched.kick_from_tournaments_by_payments(),
+}
+EVENT_JOBS = {
+    "check_event_min_users": apsched.check_event_min_users,
+    "deactivate_event": apsched.deactivate_event,
+}
+TOURNAMENT_JOBS = {
+    "check_tournament_min_teams": apsched.check_tournament_min_teams,
+    "deactivate_tournament": apsched.deactivate_tournament,
+}
+CLEANUP_JOBS = {
+    "delete_old_events": lambda bot: _daily(apsched.delete_old_events),
+}
+
+
+class Result:
+    def __init__(self, job: str, scale: float, calls: int, wall: float, queries: int, messages: int, error: str):
+        self.job = job
+        self.scale = scale
+        self.calls = calls
+        self.wall = wall
+        self.queries = queries
+        self.messages = messages
+        self.error = error
+
+    @property
+    def queries_per_call(self) -> float:
+        return self.queries / max(self.calls, 1)
+
+
+async def measure(job: str, scale: float, bot: Any, run: Callable[[], Awaitable[Any]], calls: int = 1) -> Result:
+    messages_before = sum(bot.session.calls.values())
+    error = ""
+    start = time.perf_counter()
+    with track_queries(job) as stats:
+        try:
+            await run()
+        except Exception as e:
+            error = repr(e)
+    wall = time.perf_counter() - start
+    return Result(job, scale, calls, wall, stats.count, sum(bot.session.calls.values()) - messages_before, error)
+
+
+async def sample_ids(table: str, limit: int) -> list[int]:
+    async with pg_connection() as session:
+        rows = await session.fetch(f"SELECT id FROM {table} WHERE active = true ORDER BY random() LIMIT $1", limit)
+    return [row["id"] for row in rows]
+
+
+async def run_scale(scale: float, sample: int, seed: int) -> list[Result]:
+    await generate_data.generate(argparse.Namespace(
+        users=int(BASE_SCALE["users"] * scale), events=int(BASE_SCALE["events"] * scale),
+        tournaments=int(BASE_SCALE["tournaments"] * scale), teams=BASE_SCALE["teams"],
+        days_back=30, days_ahead=30, seed=seed, truncate=True,
+    ))
+
+    bot = create_stub_bot()
+    apsched.setup_bot(bot)
+    results = []
+
+    for job, run in DAILY_JOBS.items():
+        results.append(await measure(job, scale, bot, lambda: run(bot)))
+
+    event_ids = await sample_ids("events", sample)
+    for job, func in EVENT_JOBS.items():
+        async def run_events():
+            for event_id in event_ids:
+                await func(event_id)
+        results.append(await measure(job, scale, bot, run_events, len(event_ids)))
+
+    tournament_ids = await sample_ids("tournaments", sample)
+    for job, func in TOURNAMENT_JOBS.items():
+        async def run_tournaments():
+            for tournament_id in tournament_ids:
+                await func(tournament_id)
+        results.append(await measure(job, scale, bot, run_tournaments, len(tournament_ids)))
+
+    for job, run in CLEANUP_JOBS.items():
+        results.append(await measure(job, scale, bot, lambda: run(bot)))
+
+    return results
+
+
+def print_results(results: list[Result]) -> None:
+    print(f"{'job':<36}{'scale':>7}{'calls':>7}{'wall ms':>10}{'queries':>9}{'q/call':>8}{'messages':>10}")
+    for result in results:
+        print(f"{result.job:<36}{result.scale:>7}{result.calls:>7}{result.wall * 1000:>10.1f}{result.queries:>9}"
+              f"{result.queries_per_call:>8.1f}{result.messages:>10}  {result.error}")
+
+
+def growing_jobs(results: list[Result], tolerance: float) -> list[str]:
+    """Задачи, у которых запросов на запуск на наибольшем масштабе заметно больше, чем на наименьшем"""
+    by_job: dict[str, list[Result]] = {}
+    for result in results:
+        by_job.setdefault(result.job, []).append(result)
+
+    growing = []
+    for job, job_results in by_job.items():
+        smallest = min(job_results, key=lambda result: result.scale)
+        largest = max(job_results, key=lambda result: result.scale)
+        if largest.queries_per_call > smallest.queries_per_call * (1 + tolerance) + 1:
+            growing.append(f"{job}: {smallest.queries_per_call:.1f} -> {largest.queries_per_call:.1f} запросов "
+                           f"(масштаб {smallest.scale} -> {largest.scale})")
+    return growing
+
+
+def silent_jobs(results: list[Result]) -> list[str]:
+    """Запуски, в которых задача не выполнила ни одного учтенного запроса"""
+    return [f"{result.job} (масштаб {result.scale})" for result in results if result.calls and not result.queries]
+
+
+async def amain(args: argparse.Namespace) -> int:
+    results = []
+    try:
+        for scale in args.scales:
+            results.extend(await run_scale(scale, args.sample, args.seed))
+    finally:
+        await close_pg_pool()
+
+    print_results(results)
+
+    failed = False
+    silent = silent_jobs(results)
+    if silent:
+        print("\nНе учтено ни одного запроса:")
+        print("\n".join(silent))
+        failed = True
+
+    growing = growing_jobs(results, args.tolerance)
+    if growing:
+        print("\nКоличество запросов растет с объемом данных:")
+        print("\n".join(growing))
+        failed = True
+    return 1 if failed else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=lambda value: sorted(float(scale) for scale in value.split(",")),
+                        default=[0.02, 0.1], help="доли от 100k пользователей / 5k событий / 1k турниров")
+    parser.add_argument("--sample", type=int, default=20, help="сколько событий и турниров для разовых задач")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="допустимый рост запросов на запуск")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="подтверждение очистки таблиц БД")
+    args = parser.parse_args()
+
+    if not args.truncate:
+        parser.error("бенчмарк очищает таблицы БД, запускайте только на локальной БД с флагом --truncate")
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(amain(parse_args())))
@@ -0,0 +1,106 @@
+"""
+Задержка event loop из-за хранилища задач планировщика (SQLAlchemyJobStore на синхронном psycopg).
+
+AsyncIOScheduler обращается к хранилищу при каждом пробуждении прямо в event loop: выборка задач к запуску,
+обновление next_run_time, удаление выполненных разовых задач. Бенчмарк ставит --jobs разовых задач на ближайшие
+--duration секунд и замеряет задержку loop монитором loop_monitor.LoopLagMonitor (как в боте).
+Затем сравниваются add_job/remove_job прямо в loop и через asyncio.to_thread (как в хендлерах после routers.apsched).
+
+Задачи пишутся в отдельную таблицу --table, рабочие задачи бота не затрагиваются.
+Запуск из корня проекта: python -m benchmarks.scheduler_store --jobs 200 --duration 10
+Без --url используется БД из .env (settings.db.SYNC_DATABASE_URL).
+"""
+import argparse
+import asyncio
+import datetime
+import time
+
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from loop_monitor import LoopLagMonitor
+
+_fired = 0
+
+
+async def noop_job() -> None:
+    global _fired
+    _fired += 1
+
+
+def print_lag(title: str, monitor: LoopLagMonitor) -> None:
+    quantiles = monitor.quantiles()
+    print(f"{title}: замеров {len(monitor.samples)}, "
+          + ", ".join(f"p{q * 100:g} {value * 1000:.1f} мс" for q, value in quantiles.items()))
+
+
+async def bench_wakeups(scheduler: AsyncIOScheduler, args: argparse.Namespace) -> None:
+    now = datetime.datetime.now()
+    for i in range(args.jobs):
+        run_date = now + datetime.timedelta(seconds=1 + args.duration * i / args.jobs)
+        scheduler.add_job(noop_job, trigger="date", id=f"bench_{i}", run_date=run_date, replace_existing=True)
+
+    monitor = LoopLagMonitor(args.interval, args.threshold)
+    monitor.start()
+    await asyncio.sleep(args.duration + 2)
+    await monitor.stop()
+    print_lag(f"Пробуждения планировщика ({_fired} из {args.jobs} задач выполнено)", monitor)
+
+
+async def bench_handler_calls(scheduler: AsyncIOScheduler, args: argparse.Namespace) -> None:
+    run_date = datetime.datetime.now() + datetime.timedelta(days=1)
+
+    def add_and_remove(i: int) -> None:
+        scheduler.add_job(noop_job, trigger="date", id=f"bench_call_{i}", run_date=run_date, replace_existing=True)
+        if scheduler.get_job(f"bench_call_{i}"):
+            scheduler.remove_job(f"bench_call_{i}")
+
+    for name, in_thread in (("в event loop", False), ("через asyncio.to_thread", True)):
+        monitor = LoopLagMonitor(args.interval, args.threshold)
+        monitor.start()
+        start = time.perf_counter()
+        for i in range(args.calls):
+            if in_thread:
+                await asyncio.to_thread(add_and_remove, i)
+            else:
+                add_and_remove(i)
+                # отдаем управление, как хендлер между апдейтами
+                await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(args.interval * 2)
+        await monitor.stop()
+        print_lag(f"add_job + get_job + remove_job {name} ({elapsed / args.calls * 1000:.1f} мс на вызов)", monitor)
+
+
+async def amain(args: argparse.Namespace) -> None:
+    if args.url is None:
+        from settings import settings
+        args.url = settings.db.SYNC_DATABASE_URL
+
+    jobstore = SQLAlchemyJobStore(url=args.url, tablename=args.table)
+    scheduler = AsyncIOScheduler(jobstores={"default": jobstore})
+    scheduler.start()
+    try:
+        scheduler.remove_all_jobs()
+        await bench_wakeups(scheduler, args)
+        await bench_handler_calls(scheduler, args)
+    finally:
+        scheduler.remove_all_jobs()
+        scheduler.shutdown(wait=False)
+        jobstore.jobs_t.drop(jobstore.engine, checkfirst=True)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy хранилища задач, по умолчанию БД из .env")
+    parser.add_argument("--table", default="apscheduler_jobs_bench")
+    parser.add_argument("--jobs", type=int, default=200, help="разовых задач за время замера")
+    parser.add_argument("--duration", type=float, default=10, help="сек, за сколько выполняются задачи")
+    parser.add_argument("--calls", type=int, default=100, help="вызовов add/get/remove_job для сравнения")
+    parser.add_argument("--interval", type=float, default=0.01, help="период замера задержки loop, сек")
+    parser.add_argument("--threshold", type=float, default=0.1, help="логировать стек при блокировке дольше, сек")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(amain(parse_args()))
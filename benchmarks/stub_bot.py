@@ -0,0 +1,66 @@
+"""
+Сессия Bot без сети для бенчмарков: запросы к Bot API не отправляются, ответы собираются на месте.
+"""
+import asyncio
+import datetime
+import typing
+from collections import Counter
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Chat, Message, User
+
+
+class StubSession(BaseSession):
+    """Отвечает на любые методы Bot API без обращения к Telegram, считает вызовы"""
+    def __init__(self, latency: float = 0.0, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType],
+                           timeout: int | None = None) -> TelegramType:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(bot, method)
+
+    def _result(self, bot: Bot, method: TelegramMethod[TelegramType]) -> Any:
+        returning = method.__returning__
+        returning_types = typing.get_args(returning) or (returning,)
+
+        if Message in returning_types:
+            self._message_id += 1
+            chat_id = getattr(method, "chat_id", None) or 1
+            return Message(
+                message_id=self._message_id,
+                date=datetime.datetime.now(),
+                chat=Chat(id=int(chat_id), type="private"),
+                text=getattr(method, "text", None),
+            ).as_(bot)
+        if User in returning_types:
+            return User(id=bot.id, is_bot=True, first_name="stub")
+        if bool in returning_types:
+            return True
+        if list in returning_types or typing.get_origin(returning) is list:
+            return []
+        return True
+
+    async def stream_content(self, url: str, headers: dict[str, Any] | None = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def create_stub_bot(latency: float = 0.0) -> Bot:
+    """Bot с StubSession, токен фиктивный"""
+    return Bot("42:STUB", session=StubSession(latency=latency),
+               default=DefaultBotProperties(parse_mode=ParseMode.HTML))
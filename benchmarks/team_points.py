@@ -0,0 +1,69 @@
+"""
+Сравнение utils.calculate_team_points и пакетного utils.calculate_teams_points.
+
+Запуск из корня проекта: python -m benchmarks.team_points --teams 10000
+"""
+import argparse
+import datetime
+import random
+import time
+
+import numpy as np
+
+from database.schemas import TeamUsers, User
+from routers import utils
+
+
+def generate_teams(teams_count: int, seed: int) -> list[TeamUsers]:
+    """Случайные команды от 1 до 10 игроков, у части команд есть либеро"""
+    rnd = random.Random(seed)
+    teams = []
+    user_id = 1
+    for team_id in range(1, teams_count + 1):
+        users = []
+        for _ in range(rnd.randint(1, 10)):
+            users.append(User(id=user_id, tg_id=str(user_id), username="", firstname="Имя", lastname="Фамилия",
+                              level=rnd.randint(1, 7), gender=rnd.choice(("male", "female"))))
+            user_id += 1
+
+        libero_id = rnd.choice(users).id if rnd.random() < 0.5 else None
+        teams.append(TeamUsers(team_id=team_id, title=f"team {team_id}", team_leader_id=users[0].id,
+                               team_libero_id=libero_id, created_at=datetime.datetime.now(), reserve=False,
+                               users=users))
+    return teams
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--teams", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    teams = generate_teams(args.teams, args.seed)
+
+    # построчный подсчет
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        expected = {team.team_id: utils.calculate_team_points(team.users, team.team_libero_id) for team in teams}
+    python_time = (time.perf_counter() - start) / args.repeat
+
+    # пакетный подсчет по готовым массивам
+    team_ids = np.array([team.team_id for team in teams for _ in team.users])
+    levels = np.array([user.level for team in teams for user in team.users])
+    genders = np.array([user.gender for team in teams for user in team.users])
+    is_libero = np.array([user.id == team.team_libero_id for team in teams for user in team.users])
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        result = utils.calculate_teams_points(team_ids, levels, genders, is_libero)
+    numpy_time = (time.perf_counter() - start) / args.repeat
+    assert result == expected, "Результаты calculate_teams_points отличаются от calculate_team_points"
+
+    print(f"Команд: {args.teams}, игроков: {team_ids.size}")
+    print(f"calculate_team_points:  {python_time * 1000:.1f} ms")
+    print(f"calculate_teams_points: {numpy_time * 1000:.1f} ms (x{python_time / numpy_time:.1f})")
+
+
+if __name__ == "__main__":
+    main()
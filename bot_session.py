@@ -0,0 +1,73 @@
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.__meta__ import __version__
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod, GetUpdates
+from aiogram.methods.base import TelegramType
+from aiohttp import ClientSession, ClientTimeout, TraceConfig
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+import metrics
+
+
+async def _on_queued_start(session: ClientSession, context: Any, params: Any) -> None:
+    metrics.BOT_API_QUEUED.inc()
+
+
+async def _on_queued_end(session: ClientSession, context: Any, params: Any) -> None:
+    metrics.BOT_API_QUEUED.dec()
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """Сессия Bot API с настраиваемым пулом keep-alive соединений, кэшем DNS и таймаутами по методам.
+    Запросы в работе и ожидающие свободного соединения отдаются в метриках"""
+    def __init__(self, limit: int, keepalive_timeout: float, dns_ttl: int, timeout: float, connect_timeout: float,
+                 method_timeouts: dict[str, float] | None = None, **kwargs: Any):
+        super().__init__(limit=limit, timeout=timeout, **kwargs)
+        # у Bot API один хост, поэтому лимит на хост равен общему
+        self._connector_init.update(
+            limit_per_host=limit,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_ttl,
+            use_dns_cache=True,
+        )
+        self.connect_timeout = connect_timeout
+        self.method_timeouts = method_timeouts or {}
+
+    async def create_session(self) -> ClientSession:
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            # ожидание свободного соединения в пуле коннектора
+            trace_config = TraceConfig()
+            trace_config.on_connection_queued_start.append(_on_queued_start)
+            trace_config.on_connection_queued_end.append(_on_queued_end)
+
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{__version__}"},
+                trace_configs=[trace_config],
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType],
+                           timeout: Optional[int] = None) -> TelegramType:
+        # таймаут long polling getUpdates aiogram передает сам
+        if timeout is None:
+            total = self.method_timeouts.get(type(method).__name__, self.timeout)
+            timeout = ClientTimeout(total=total, sock_connect=self.connect_timeout)
+
+        # getUpdates висит постоянно, в запросах в работе он не учитывается
+        if isinstance(method, GetUpdates):
+            return await super().make_request(bot, method, timeout)
+
+        metrics.BOT_API_IN_FLIGHT.inc()
+        try:
+            return await super().make_request(bot, method, timeout)
+        finally:
+            metrics.BOT_API_IN_FLIGHT.dec()
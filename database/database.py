@@ -1,15 +1,66 @@
+import contextlib
+from typing import AsyncIterator
+
+import asyncpg
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from settings import settings
+from database.query_stats import instrument_engine, TrackedConnection
 
 
 async_engine = create_async_engine(
     url=settings.db.DATABASE_URL,
     echo=False,
+    connect_args={"server_settings": {"application_name": settings.db.application_name}},
 )
+instrument_engine(async_engine)
 
 
 async_session_factory = async_sessionmaker(async_engine, autocommit=False)
 
+# пул соединений asyncpg для задач планировщика, создается при первом обращении
+_pg_pool: asyncpg.Pool | None = None
+
+# последние значения открытых соединений к БД (обновляются задачей watch_db_backends)
+db_backends: dict[str, int] = {"total": 0, "own": 0, "pool_size": 0, "pool_idle": 0}
+
+
+async def get_pg_pool() -> asyncpg.Pool:
+    """Получение пула соединений asyncpg"""
+    global _pg_pool
+    if _pg_pool is None:
+        _pg_pool = await asyncpg.create_pool(
+            user=settings.db.postgres_user,
+            host=settings.db.postgres_host,
+            password=settings.db.postgres_password,
+            port=settings.db.postgres_port,
+            database=settings.db.postgres_db,
+            min_size=1,
+            max_size=settings.scheduler_pool_size,
+            server_settings={
+                "application_name": settings.db.application_name,
+                "statement_timeout": str(settings.db.statement_timeout),
+            },
+            connection_class=TrackedConnection,
+        )
+    return _pg_pool
+
+
+@contextlib.asynccontextmanager
+async def pg_connection() -> AsyncIterator[asyncpg.Connection]:
+    """Соединение из пула, возвращается в пул при выходе из контекста (в том числе при ошибке)"""
+    pool = await get_pg_pool()
+    async with pool.acquire() as conn:
+        yield conn
+
+
+async def close_pg_pool() -> None:
+    """Закрытие пула соединений при остановке бота"""
+    global _pg_pool
+    if _pg_pool is not None:
+        await _pg_pool.close()
+        _pg_pool = None
+
+
 # class DatabaseSessionManager:
 #     def __init__(self, host: str, engine_kwargs: dict[str, Any] = {}):
 #         self._engine = create_async_engine(host, **engine_kwargs)
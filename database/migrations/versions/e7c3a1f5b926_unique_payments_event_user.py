@@ -0,0 +1,49 @@
+"""unique payments event user
+
+Revision ID: e7c3a1f5b926
+Revises: d2a6f9b3e184
+Create Date: 2026-10-19 15:31:44.208417
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7c3a1f5b926"
+down_revision: Union[str, None] = "d2a6f9b3e184"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # дубли от повторных нажатий "Оплатил": оставляем подтвержденный платеж, иначе самый ранний
+    op.execute(
+        """
+        DELETE FROM payments
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY event_id, user_id ORDER BY paid_confirm DESC, id
+                ) AS position
+                FROM payments
+            ) AS ranked
+            WHERE position > 1
+        )
+        """
+    )
+    op.drop_index("ix_payments_event_id_user_id", table_name="payments")
+    op.create_unique_constraint("uq_payments_event_id_user_id", "payments", ["event_id", "user_id"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_payments_event_id_user_id", "payments", type_="unique")
+    op.create_index(
+        "ix_payments_event_id_user_id",
+        "payments",
+        ["event_id", "user_id"],
+        unique=False,
+    )
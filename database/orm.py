@@ -3,10 +3,12 @@ from typing import List, Any
 from collections.abc import Mapping
 
 import pytz
-from sqlalchemy import select, delete, update, text, and_
+from sqlalchemy import select, delete, update, text, and_, literal, func
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import joinedload, selectinload
 import asyncpg
 
+import metrics
 import settings
 from database.schemas import Tournament, TournamentAdd, TeamUsers, User, UserAdd, TournamentTeams, TournamentPayment, \
     TournamentPaid
@@ -15,9 +17,12 @@ from database.database import async_engine, async_session_factory
 from database.tables import Base
 from database import schemas
 from database import tables
+from database.user_cache import UserCache
 
 Mapping.register(asyncpg.Record)
 
+users_cache = UserCache(settings.settings.user_cache_ttl, settings.settings.user_cache_size)
+
 
 class AsyncOrm:
     @staticmethod
@@ -29,15 +34,23 @@ class AsyncOrm:
 
     # USERS
     @staticmethod
-    async def add_user(user_add: schemas.UserAdd):
-        """Создание tables.User"""
+    async def add_user(user_add: schemas.UserAdd) -> schemas.User:
+        """Создание tables.User одним запросом, при повторной отправке имени возвращается уже созданный пользователь"""
         async with async_session_factory() as session:
-            user = tables.User(**user_add.dict())
-            session.add(user)
-            # flush взаимодействует с БД, поэтому пишем await
-            await session.flush()
+            query = postgresql.insert(tables.User).values(**user_add.model_dump())
+            # пустое обновление нужно, чтобы RETURNING вернул существующую строку
+            query = query.on_conflict_do_update(
+                index_elements=[tables.User.tg_id],
+                set_={"username": query.excluded.username}
+            ).returning(tables.User)
+
+            row = (await session.scalars(query)).one()
+            user = schemas.User.model_validate(row, from_attributes=True)
             await session.commit()
 
+        users_cache.put(user)
+        return user
+
     @staticmethod
     async def update_user(tg_id: str, firstname: str, lastname: str):
         """Обновить ФИО пользователя"""
@@ -49,6 +62,7 @@ class AsyncOrm:
             await session.execute(query)
             await session.flush()
             await session.commit()
+        users_cache.invalidate(tg_id)
 
     @staticmethod
     async def get_user_by_id(user_id: int) -> schemas.User:
@@ -64,6 +78,10 @@ class AsyncOrm:
     @staticmethod
     async def get_user_by_tg_id(tg_id: str) -> schemas.User | None:
         """Получение tables.User по tg_id"""
+        user = users_cache.get(tg_id)
+        if user:
+            return user
+
         async with async_session_factory() as session:
             query = select(tables.User).where(tables.User.tg_id == tg_id)
             result = await session.execute(query)
@@ -71,6 +89,7 @@ class AsyncOrm:
 
             if row:
                 user = schemas.User.model_validate(row, from_attributes=True)
+                users_cache.put(user)
                 return user
             else:
                 return
@@ -123,15 +142,69 @@ class AsyncOrm:
             users = [schemas.UserRel.model_validate(row, from_attributes=True) for row in rows]
             return users
 
+    # SCHEDULER
+    @staticmethod
+    async def save_scheduler_job_run(job_name: str, started_at: datetime.datetime, duration: float,
+                                     error: str | None) -> None:
+        """Сохранение времени выполнения задачи планировщика"""
+        success = error is None
+        finished_at = started_at + datetime.timedelta(seconds=duration)
+
+        async with async_session_factory() as session:
+            query = postgresql.insert(tables.SchedulerJobRun).values(
+                job_name=job_name,
+                last_started_at=started_at,
+                last_duration=duration,
+                last_success_at=finished_at if success else None,
+                last_error=error,
+                runs_count=1,
+                failures_count=0 if success else 1,
+            )
+            query = query.on_conflict_do_update(
+                index_elements=[tables.SchedulerJobRun.job_name],
+                set_={
+                    "last_started_at": query.excluded.last_started_at,
+                    "last_duration": query.excluded.last_duration,
+                    "last_success_at": func.coalesce(query.excluded.last_success_at,
+                                                     tables.SchedulerJobRun.last_success_at),
+                    "last_error": query.excluded.last_error,
+                    "runs_count": tables.SchedulerJobRun.runs_count + 1,
+                    "failures_count": tables.SchedulerJobRun.failures_count + query.excluded.failures_count,
+                }
+            )
+
+            await session.execute(query)
+            await session.commit()
+
+    @staticmethod
+    async def get_open_backends_count(session: Any) -> tuple[int, int]:
+        """Получение количества открытых соединений к БД: всего и открытых ботом"""
+        try:
+            row = await session.fetchrow(
+                """
+                SELECT count(*) AS total,
+                       count(*) FILTER (WHERE application_name = $1) AS own
+                FROM pg_stat_activity
+                WHERE datname = current_database()
+                """,
+                settings.settings.db.application_name
+            )
+            return row["total"], row["own"]
+
+        except Exception as e:
+            logger.error(f"Ошибка при получении количества соединений к БД: {e}")
+
     # EVENTS
     @staticmethod
-    async def add_event(event: schemas.EventAdd):
+    async def add_event(event: schemas.EventAdd) -> schemas.Event:
         """Создание tables.Event"""
         async with async_session_factory() as session:
             event = tables.Event(**event.dict())
             session.add(event)
             await session.flush()
+            new_event = schemas.Event.model_validate(event, from_attributes=True)
             await session.commit()
+            return new_event
 
     @staticmethod
     async def delete_event(event_id: int) -> None:
@@ -144,18 +217,19 @@ class AsyncOrm:
             await session.commit()
 
     @staticmethod
-    async def get_event_by_id(event_id: int) -> schemas.Event:
+    async def get_event_by_id(event_id: int) -> schemas.Event | None:
         """Получение tables.User по id"""
         async with async_session_factory() as session:
             query = select(tables.Event).where(tables.Event.id == event_id)
             result = await session.execute(query)
             row = result.scalars().first()
-
-            event = schemas.Event.model_validate(row, from_attributes=True)
-            return event
+            if row:
+                event = schemas.Event.model_validate(row, from_attributes=True)
+                return event
+            return
 
     @staticmethod
-    async def get_event_with_users(event_id: int) -> schemas.EventRel:
+    async def get_event_with_users(event_id: int) -> schemas.EventRel | None:
         """Событие с его пользователями"""
         async with async_session_factory() as session:
             query = select(tables.Event) \
@@ -164,9 +238,10 @@ class AsyncOrm:
 
             result = await session.execute(query)
             row = result.scalars().first()
-
-            event = schemas.EventRel.model_validate(row, from_attributes=True)
-            return event
+            if row:
+                event = schemas.EventRel.model_validate(row, from_attributes=True)
+                return event
+            return
 
     @staticmethod
     async def get_events(only_active: bool = True, days_ahead: int = None) -> List[schemas.Event]:
@@ -320,6 +395,7 @@ class AsyncOrm:
             await session.execute(query)
             await session.flush()
             await session.commit()
+        users_cache.invalidate_id(user_id)
 
     @staticmethod
     async def update_event_status_to_false(event_id: int):
@@ -379,10 +455,40 @@ class AsyncOrm:
             return events_reserved_sorted_by_date
 
     @staticmethod
-    async def transfer_from_reserve_to_event(event_id: int, user_id: int):
-        """Перевод пользователя из резерва в основу"""
-        await AsyncOrm.add_user_to_event(event_id, user_id)
-        await AsyncOrm.delete_from_reserve(event_id, user_id)
+    async def transfer_first_from_reserve_to_event(event_id: int) -> schemas.User | None:
+        """Перевод первого пользователя из резерва в основу одним запросом, возвращает переведенного пользователя"""
+        # первая запись резерва, уже заблокированные другой транзакцией пропускаем
+        first_reserve = select(tables.Reserved.id, tables.Reserved.user_id) \
+            .where(tables.Reserved.event_id == event_id) \
+            .order_by(tables.Reserved.date.asc(), tables.Reserved.id.asc()) \
+            .limit(1) \
+            .with_for_update(skip_locked=True) \
+            .cte("first_reserve")
+
+        deleted_reserve = delete(tables.Reserved) \
+            .where(tables.Reserved.id.in_(select(first_reserve.c.id))) \
+            .returning(tables.Reserved.user_id) \
+            .cte("deleted_reserve")
+
+        added_user = postgresql.insert(tables.EventsUsers) \
+            .from_select(["user_id", "event_id"], select(deleted_reserve.c.user_id, literal(event_id))) \
+            .on_conflict_do_nothing() \
+            .cte("added_user")
+
+        query = select(tables.User) \
+            .join(deleted_reserve, tables.User.id == deleted_reserve.c.user_id) \
+            .add_cte(added_user)
+
+        async with async_session_factory() as session:
+            result = await session.execute(query)
+            row = result.scalars().first()
+            await session.commit()
+
+            if row:
+                user = schemas.User.model_validate(row, from_attributes=True)
+                logger.info(f"Пользователь id {user.id} переведен из резерва в основу события id {event_id}")
+                return user
+            return
 
     @staticmethod
     async def delete_from_reserve(event_id: int, user_id: int):
@@ -400,19 +506,24 @@ class AsyncOrm:
 
     # PAYMENTS
     @staticmethod
-    async def create_payments(user_id: int, event_id: int):
-        """Создание записи с платежом от пользователя"""
+    async def create_payments(user_id: int, event_id: int) -> bool:
+        """Создание записи с платежом от пользователя, False если платеж уже есть (повторное нажатие "Оплатил")"""
         async with async_session_factory() as session:
-            payment = tables.PaymentsUserEvent(
+            query = postgresql.insert(tables.PaymentsUserEvent).values(
                 event_id=event_id,
                 user_id=user_id,
-                paid=True
-            )
-            session.add(payment)
+                paid=True,
+                paid_confirm=False,
+            ).on_conflict_do_nothing(
+                index_elements=[tables.PaymentsUserEvent.event_id, tables.PaymentsUserEvent.user_id]
+            ).returning(tables.PaymentsUserEvent.id)
 
-            await session.flush()
+            result = await session.execute(query)
+            payment_id = result.scalar()
             await session.commit()
 
+            return payment_id is not None
+
     @staticmethod
     async def get_payment_by_id(payment_id: int) -> schemas.Payment:
         """Получение оплаты по id"""
@@ -444,25 +555,6 @@ class AsyncOrm:
                 return payment
             return
 
-    @staticmethod
-    async def get_user_payments_with_events_and_users(user_tg_id: str) -> list[schemas.PaymentsEventsUsers]:
-        """Получение оплаты по id"""
-        user = await AsyncOrm.get_user_by_tg_id(user_tg_id)
-
-        async with async_session_factory() as session:
-            query = select(tables.PaymentsUserEvent)\
-                .filter(and_(tables.PaymentsUserEvent.user_id == user.id,))\
-                .options(joinedload(tables.PaymentsUserEvent.event))\
-                .options(joinedload(tables.PaymentsUserEvent.user))\
-
-            result = await session.execute(query)
-            rows = result.unique().scalars().all()
-
-            payments = [schemas.PaymentsEventsUsers.model_validate(row, from_attributes=True) for row in rows]
-            payments_sorted_by_date = sorted(payments, key=lambda payment: payment.event.date)
-
-            return payments_sorted_by_date
-
     @staticmethod
     async def update_payment_status(event_id: int, user_id: int) -> None:
         """Изменение статуса оплаты после подтверждения оплаты"""
@@ -506,8 +598,8 @@ class AsyncOrm:
             return users
 
     @staticmethod
-    async def create_tournament(tournament: TournamentAdd, session: Any) -> None:
-        """Создание турнира"""
+    async def create_tournament(tournament: TournamentAdd, session: Any) -> int | None:
+        """Создание турнира, возвращает id турнира"""
         try:
             tournament_id = await session.fetchval(
                 """
@@ -519,6 +611,7 @@ class AsyncOrm:
                 tournament.min_team_players, tournament.max_team_players, tournament.active, tournament.level, tournament.price
             )
             logger.info(f"Добавлен турнир с id {tournament_id} {tournament.title} {tournament.date}")
+            return tournament_id
 
         except Exception as e:
             logger.error(f"Ошибка при создании турнира: {e}")
@@ -842,6 +935,7 @@ class AsyncOrm:
                 """,
                 gender, tg_id
             )
+            users_cache.invalidate(tg_id)
             logger.info(f"Пользователь tg_id {tg_id} указал пол {gender}")
 
         except Exception as e:
@@ -915,86 +1009,73 @@ class AsyncOrm:
             raise
 
     @staticmethod
-    async def get_first_reserve_team(tournament_id: int, session: Any) -> TeamUsers | None:
-        """Получение первой команды из резерва"""
+    async def transfer_first_reserve_team(tournament_id: int, session: Any) -> TeamUsers | None:
+        """Перевод первой команды из резерва в основу, возвращает команду с игроками для оповещения"""
         try:
             rows = await session.fetch(
                 """
-                SELECT t.id AS team_id, t.title AS title, t.team_leader_id as team_leader_id, t.created_at, t.reserve,
+                WITH first_team AS (
+                    SELECT id FROM teams
+                    WHERE tournament_id = $1 AND reserve = true
+                    ORDER BY created_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                ), promoted AS (
+                    UPDATE teams AS t
+                    SET reserve = false
+                    FROM first_team
+                    WHERE t.id = first_team.id
+                    RETURNING t.id, t.title, t.team_leader_id, t.team_libero_id, t.created_at, t.reserve
+                )
+                SELECT p.id AS team_id, p.title AS title, p.team_leader_id AS team_leader_id,
+                p.team_libero_id AS team_libero_id, p.created_at, p.reserve,
                 u.id AS user_id, u.tg_id AS tg_id, u.username AS username, u.firstname AS firstname, u.gender,
-                u.lastname AS lastname, u.level AS user_level 
-                FROM teams AS t
-                JOIN teams_users AS tu ON t.id = tu.team_id
-                JOIN users AS u ON tu.user_id=u.id
-                WHERE t.tournament_id = $1 AND reserve = true
-                ORDER BY t.created_at
+                u.lastname AS lastname, u.level AS user_level
+                FROM promoted AS p
+                LEFT JOIN teams_users AS tu ON p.id = tu.team_id
+                LEFT JOIN users AS u ON tu.user_id = u.id
                 """,
                 tournament_id
             )
-            if rows:
-                result = []
-
-                # Разбиваем пользователей по командам
-                teams_users = {}
-                for row in rows:
-                    user = User(id=row["user_id"], tg_id=row["tg_id"], username=row["username"], firstname=row["firstname"],
-                        lastname=row["lastname"], level=row["user_level"], gender=row["gender"])
-                    if row["title"] in teams_users.keys():
-                        teams_users[row["title"]].append(user)
-                    else:
-                        teams_users[row["title"]] = [user]
-
-                # Формируем модель TeamUsers
-                used_teams = []
-                for row in rows:
-                    if row["title"] in used_teams:
-                        continue
-                    else:
-                        result.append(
-                            TeamUsers(team_id=row["team_id"], title=row["title"], team_leader_id=row["team_leader_id"],
-                                created_at=row["created_at"], reserve=row["reserve"], users=teams_users[row["title"]]))
-                        used_teams.append(row["title"])
-
-                return result[0]
-
-            else:
+            if not rows:
                 return None
 
-        except Exception as e:
-            logger.error(f"Ошибка при получении первой резервной команды с игроками, турнир id {tournament_id}: {e}")
-
-    @staticmethod
-    async def transfer_team_from_reserve(team_id: int, session: Any) -> None:
-        """Изменение статуса команды с резерва на основу"""
-        try:
-            await session.execute(
-                """
-                UPDATE teams
-                SET reserve = false
-                WHERE id = $1
-                """,
-                team_id
-            )
-            logger.info(f"Команда id {team_id} переведена в основу")
+            users = [
+                User(id=row["user_id"], tg_id=row["tg_id"], username=row["username"], firstname=row["firstname"],
+                     lastname=row["lastname"], level=row["user_level"], gender=row["gender"])
+                for row in rows if row["user_id"] is not None
+            ]
+            team = TeamUsers(team_id=rows[0]["team_id"], title=rows[0]["title"], team_leader_id=rows[0]["team_leader_id"],
+                             team_libero_id=rows[0]["team_libero_id"], created_at=rows[0]["created_at"],
+                             reserve=rows[0]["reserve"], users=users)
+            logger.info(f"Команда id {team.team_id} переведена из резерва в основу турнира id {tournament_id}")
+            return team
 
         except Exception as e:
-            logger.error(f"Ошибка при переводе команды id {team_id} в основу: {e}")
+            logger.error(f"Ошибка при переводе первой резервной команды в основу, турнир id {tournament_id}: {e}")
 
     @staticmethod
-    async def create_tournament_payment(team_id: int, tournament_id: int, session: Any) -> None:
-        """Создание платежа после подтверждения пользователем"""
+    async def create_tournament_payment(team_id: int, tournament_id: int, session: Any) -> bool:
+        """Создание платежа после подтверждения пользователем, False если платеж команды уже есть"""
         try:
-            await session.execute(
+            payment_id = await session.fetchval(
                 """
                 INSERT INTO tournament_payments (paid, paid_confirm, confirmed_at, team_id, tournament_id)
                 VALUES (true, false, null, $1, $2)
+                ON CONFLICT (team_id) DO NOTHING
+                RETURNING id
                 """,
                 team_id, tournament_id
             )
+            if payment_id is None:
+                return False
+
             logger.info(f"Капитан команды id {team_id} отправил платеж")
+            return True
 
         except Exception as e:
             logger.error(f"Ошибка при создании платежа для команды id {team_id}: {e}")
+            return False
 
     @staticmethod
     async def get_tournament_payment_by_team_id(team_id: int, session: Any) -> TournamentPayment | None:
@@ -1090,6 +1171,35 @@ class AsyncOrm:
         except Exception as e:
             logger.error(f"Ошибка при получении турниров для пользователя id {user_id}: {e}")
 
+    @staticmethod
+    async def get_my_events(tg_id: str, session: Any) -> list[schemas.MyEvent]:
+        """Активные события (по оплатам, с отметкой резерва) и турниры пользователя одним запросом, по дате"""
+        try:
+            rows = await session.fetch(
+                """
+                SELECT 'event' AS kind, p.id, e.date, e.type, p.paid_confirm,
+                    EXISTS (SELECT 1 FROM reserved AS r WHERE r.event_id = e.id AND r.user_id = u.id) AS reserved
+                FROM users AS u
+                JOIN payments AS p ON p.user_id = u.id
+                JOIN events AS e ON e.id = p.event_id
+                WHERE u.tg_id = $1 AND e.active = true
+                UNION ALL
+                SELECT 'tournament' AS kind, t.id, t.date, t.type, false AS paid_confirm, false AS reserved
+                FROM users AS u
+                JOIN teams_users AS ts ON ts.user_id = u.id
+                JOIN teams AS tm ON tm.id = ts.team_id
+                JOIN tournaments AS t ON t.id = tm.tournament_id
+                WHERE u.tg_id = $1 AND t.active = true
+                ORDER BY date
+                """,
+                tg_id
+            )
+            return [schemas.MyEvent.model_validate(dict(row)) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Ошибка при получении событий пользователя tg_id {tg_id}: {e}")
+            return []
+
     @staticmethod
     async def update_team_libero(team_id: int, user_id: int, session: Any) -> None:
         """Обновляет либеро в команде"""
@@ -1140,3 +1250,7 @@ class AsyncOrm:
 
         except Exception as e:
             logger.error(f"Ошибка при переводе турнира id {tournament_id} в неактивные: {e}")
+
+
+# замер времени выполнения всех методов AsyncOrm
+metrics.instrument_class(AsyncOrm, metrics.ORM_LATENCY)
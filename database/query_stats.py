@@ -0,0 +1,139 @@
+import contextlib
+import contextvars
+import functools
+import re
+import time
+from collections import Counter
+from typing import Iterator
+
+import asyncpg
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryStats:
+    """Количество и время SQL запросов в рамках одного апдейта (или блока кода)"""
+    def __init__(self, label: str = "", capture: bool = False):
+        self.label = label
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter[str] = Counter()
+        # тексты запросов с параметрами и временем, только при capture=True (например для EXPLAIN)
+        self.statements: list[tuple[str, tuple, float]] | None = [] if capture else None
+        # статистика внешнего блока track_queries, в нее запросы тоже засчитываются
+        self.parent: QueryStats | None = None
+
+    def record(self, query: str, elapsed: float, args: tuple = ()) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[query_shape(query)] += 1
+        if self.statements is not None:
+            self.statements.append((query, tuple(args or ()), elapsed))
+        if self.parent is not None:
+            self.parent.record(query, elapsed, args)
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Запросы одного вида, выполненные больше threshold раз (признак N+1)"""
+        return {shape: count for shape, count in self.shapes.items() if count > threshold}
+
+
+_current_stats: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("query_stats", default=None)
+
+_whitespace_re = re.compile(r"\s+")
+_literal_re = re.compile(r"'(?:[^']|'')*'|\$\d+|\b\d+(?:\.\d+)?\b")
+_in_list_re = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@functools.lru_cache(maxsize=1024)
+def query_shape(query: str) -> str:
+    """Вид запроса без параметров и литералов, чтобы одинаковые запросы с разными id считались одним"""
+    shape = _whitespace_re.sub(" ", query).strip()
+    shape = _literal_re.sub("?", shape)
+    return _in_list_re.sub("(?...)", shape)
+
+
+def record_query(query: str, elapsed: float, args: tuple = ()) -> None:
+    """Учет запроса в статистике текущего апдейта"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(query, elapsed, args)
+
+
+@contextlib.contextmanager
+def track_queries(label: str = "", capture: bool = False) -> Iterator[QueryStats]:
+    """Подсчет запросов, выполненных внутри блока (в том числе во вложенных корутинах)"""
+    stats = QueryStats(label, capture)
+    stats.parent = _current_stats.get()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextlib.contextmanager
+def assert_max_queries(max_count: int, label: str = "") -> Iterator[QueryStats]:
+    """Проверка, что блок (например вызов хендлера) выполняет не больше max_count запросов"""
+    with track_queries(label) as stats:
+        yield stats
+
+    if stats.count > max_count:
+        shapes = "\n".join(f"{count} x {shape}" for shape, count in stats.shapes.most_common())
+        raise AssertionError(f"{label or 'Блок'} выполнил {stats.count} запросов (допустимо {max_count}):\n{shapes}")
+
+
+@contextlib.contextmanager
+def _timed_query(query: str, args: tuple = ()) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_query(query, time.perf_counter() - start, args)
+
+
+class TrackedConnection(asyncpg.Connection):
+    """Соединение asyncpg, запросы которого учитываются в статистике сразу по завершении.
+    Логгеры запросов asyncpg вызываются через call_soon, уже после выхода из блока track_queries"""
+    async def execute(self, query: str, *args, timeout: float = None) -> str:
+        with _timed_query(query, args):
+            return await super().execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command: str, args, *, timeout: float = None):
+        with _timed_query(command):
+            return await super().executemany(command, args, timeout=timeout)
+
+    async def fetch(self, query, *args, timeout=None, record_class=None):
+        with _timed_query(query, args):
+            return await super().fetch(query, *args, timeout=timeout, record_class=record_class)
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        with _timed_query(query, args):
+            return await super().fetchval(query, *args, column=column, timeout=timeout)
+
+    async def fetchrow(self, query, *args, timeout=None, record_class=None):
+        with _timed_query(query, args):
+            return await super().fetchrow(query, *args, timeout=timeout, record_class=record_class)
+
+    async def fetchmany(self, query, args, *, timeout=None, record_class=None):
+        with _timed_query(query):
+            return await super().fetchmany(query, args, timeout=timeout, record_class=record_class)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Учет запросов, выполненных через SQLAlchemy"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        record_query(statement, time.perf_counter() - start, () if executemany else parameters)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # after_cursor_execute не вызывается при ошибке запроса
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
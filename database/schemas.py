@@ -111,3 +111,12 @@ class TournamentPayment(BaseModel):
     tournament_id: int
     team_id: int
 
+
+class MyEvent(BaseModel):
+    """Строка вкладки "Мои события": событие (id оплаты) или турнир (id турнира)"""
+    kind: str   # "event" или "tournament"
+    id: int
+    date: datetime.datetime
+    type: str
+    paid_confirm: bool
+    reserved: bool
@@ -1,6 +1,6 @@
 import datetime
 from sqlalchemy.orm import Mapped, mapped_column, relationship, DeclarativeBase
-from sqlalchemy import text, ForeignKey
+from sqlalchemy import text, ForeignKey, Index, UniqueConstraint
 
 
 class Base(DeclarativeBase):
@@ -95,6 +95,12 @@ class PaymentsUserEvent(Base):
     """Записи пользователей на мероприятия"""
 
     __tablename__ = "payments"
+    __table_args__ = (
+        # одна оплата пользователя за событие, индекс ограничения используется и для выборки на карточке события
+        UniqueConstraint("event_id", "user_id", name="uq_payments_event_id_user_id"),
+        # вкладка "Мои события" выбирает оплаты пользователя
+        Index("ix_payments_user_id", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     paid: Mapped[bool] = mapped_column(default=False)   # True если пользователь нажал "Оплатил"
@@ -111,6 +117,10 @@ class Reserved(Base):
     """Запасные пользователи для участия в обычных событиях"""
 
     __tablename__ = "reserved"
+    __table_args__ = (
+        # очередь резерва события выбирается по дате записи
+        Index("ix_reserved_event_id_date", "event_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     date: Mapped[datetime.datetime] = mapped_column(server_default=text("TIMEZONE('utc', now())"))
@@ -150,6 +160,10 @@ class Tournament(Base):
 class Team(Base):
     """Таблица команд для турнира"""
     __tablename__ = "teams"
+    __table_args__ = (
+        # команды турнира и очередь резерва выбираются по дате создания
+        Index("ix_teams_tournament_id_created_at", "tournament_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(index=True)
@@ -207,5 +221,14 @@ class PaymentsTournament(Base):
     team: Mapped["Team"] = relationship(back_populates="payment")
 
 
+class SchedulerJobRun(Base):
+    """Время выполнения и последний успешный запуск задач планировщика"""
+    __tablename__ = "scheduler_job_runs"
 
-
+    job_name: Mapped[str] = mapped_column(primary_key=True)
+    last_started_at: Mapped[datetime.datetime]
+    last_duration: Mapped[float]    # длительность последнего запуска в секундах
+    last_success_at: Mapped[datetime.datetime] = mapped_column(nullable=True)
+    last_error: Mapped[str] = mapped_column(nullable=True)
+    runs_count: Mapped[int] = mapped_column(default=0)
+    failures_count: Mapped[int] = mapped_column(default=0)
@@ -0,0 +1,39 @@
+import collections
+import time
+
+from database import schemas
+
+
+class UserCache:
+    """Пользователи по tg_id в памяти процесса, чтобы не читать users на каждом нажатии.
+    Методы AsyncOrm, меняющие пользователя, сбрасывают запись"""
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users: collections.OrderedDict[str, tuple[float, schemas.User]] = collections.OrderedDict()
+
+    def get(self, tg_id: str) -> schemas.User | None:
+        cached = self._users.get(tg_id)
+        if cached is None:
+            return None
+        expires_at, user = cached
+        if expires_at < time.monotonic():
+            del self._users[tg_id]
+            return None
+        return user
+
+    def put(self, user: schemas.User) -> None:
+        if self.ttl <= 0:
+            return
+        self._users[user.tg_id] = (time.monotonic() + self.ttl, user)
+        self._users.move_to_end(user.tg_id)
+        if len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    def invalidate(self, tg_id: str) -> None:
+        self._users.pop(tg_id, None)
+
+    def invalidate_id(self, user_id: int) -> None:
+        for tg_id, (_, user) in list(self._users.items()):
+            if user.id == user_id:
+                del self._users[tg_id]
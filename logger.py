@@ -1,43 +1,124 @@
+import atexit
+import collections
+import copy
 import os
+import queue
+import random
 import sys
+import threading
 
 from loguru import logger
 
+from settings import settings
+
 log_folder = "logs"
 if not os.path.exists(log_folder):
     os.makedirs(log_folder)
 
 # иначе логи дублируются
 logger.remove()
+# id апдейта проставляет LogContextMiddleware, вне апдейтов "-"
+logger.configure(extra={"update_id": "-"})
+
+# отдельный логгер с настоящими sink'ами, в него пишет только фоновый поток
+_writer = copy.deepcopy(logger)
 
 # вывод в консоль
-logger.add(
+_writer.add(
     sys.stdout,
     level="DEBUG",
     colorize=True,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | <cyan>{file}:{line}</cyan> | <level>{message}</level>"
+    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | <cyan>{file}:{line}</cyan> | "
+           "<magenta>{extra[update_id]}</magenta> | <level>{message}</level>"
 )
 
 # запись в .log файл
 log_file_path = os.path.join(log_folder, "bot.log")
 
-# запись всех логов
-logger.add(
+# запись всех логов, JSON по строке на запись (update_id в record.extra)
+_writer.add(
     log_file_path,
     level="INFO",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {file}:{line} | {message}",
+    serialize=True,
     rotation="100 MB",
     retention="60 days",
 )
 
 # запись ошибок
 error_log_file_path = os.path.join(log_folder, "bot_errors.log")
-logger.add(
+_writer.add(
     error_log_file_path,
     level="ERROR",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {file}:{line} | {message}",
+    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {file}:{line} | {extra[update_id]} | {message}",
     rotation="100 MB",
     retention="60 days",
 )
 
+
+class LogStats:
+    """Счетчики фоновой записи логов (отдаются в метриках)"""
+    def __init__(self):
+        self.dropped: collections.Counter[str] = collections.Counter()   # по уровням
+        self.sampled_out = 0
+
+    @property
+    def queue_size(self) -> int:
+        return _queue.qsize()
+
+
+log_stats = LogStats()
+
+_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+
+
+def _sample(record: dict) -> bool:
+    """Сэмплирование INFO и DEBUG записей по модулю (settings.log_sampling), WARNING и выше пишутся всегда"""
+    rate = settings.log_sampling.get(record["name"])
+    if rate is None or record["level"].no >= 30 or random.random() < rate:
+        return True
+    log_stats.sampled_out += 1
+    return False
+
+
+def _enqueue(message) -> None:
+    """Sink основного логгера: только кладет запись в очередь, не блокируя event loop"""
+    record = message.record
+    try:
+        _queue.put_nowait(record)
+    except queue.Full:
+        log_stats.dropped[record["level"].name] += 1
+
+
+def _write_records() -> None:
+    """Фоновый поток: передает записи из очереди настоящим sink'ам с исходными временем, файлом и строкой"""
+    reported = 0
+    while True:
+        record = _queue.get()
+        if record is None:
+            break
+
+        _writer.patch(lambda r, original=record: r.update(original)).log(record["level"].name, "")
+
+        dropped = sum(log_stats.dropped.values())
+        if dropped > reported and _queue.empty():
+            _writer.warning(f"Очередь логов переполнена, пропущено записей: {dropped - reported}")
+            reported = dropped
+
+
+_thread = threading.Thread(target=_write_records, name="log_writer", daemon=True)
+_thread.start()
+
+logger.add(_enqueue, level="DEBUG", format="{message}", filter=_sample, catch=True)
+
+
+@atexit.register
+def _flush() -> None:
+    """Дописываем очередь при остановке бота"""
+    try:
+        _queue.put(None, timeout=1)
+    except queue.Full:
+        return
+    _thread.join(timeout=5)
+
+
 logger = logger
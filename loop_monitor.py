@@ -0,0 +1,81 @@
+import asyncio
+import collections
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+from logger import logger
+
+QUANTILES = (0.5, 0.9, 0.99, 1.0)
+
+
+class LoopLagMonitor:
+    """Замер задержки event loop и поиск блокирующего кода.
+
+    Корутина монитора просыпается каждые interval секунд, опоздание пробуждения - задержка loop.
+    Сторожевой поток следит за временем последнего пробуждения, и если loop занят дольше threshold,
+    логирует стек потока loop в этот момент - это и есть блокирующий вызов"""
+    def __init__(self, interval: float, threshold: float, window: int = 3000):
+        self.interval = interval
+        self.threshold = threshold
+        # последние замеры для перцентилей (по умолчанию около 5 минут)
+        self.samples: collections.deque[float] = collections.deque(maxlen=window)
+        self._heartbeat = time.monotonic()
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: int | None = None
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure(), name="loop_lag_monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop_lag_watchdog", daemon=True)
+        self._watchdog.start()
+        metrics.REGISTRY.add_collector(self.collect)
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _measure(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.monotonic()
+            lag = max(0.0, self._heartbeat - start - self.interval)
+            self.samples.append(lag)
+            metrics.LOOP_LAG.observe(lag)
+
+    def _watch(self) -> None:
+        """Сторожевой поток: один лог со стеком на каждую блокировку"""
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.threshold or reported == heartbeat:
+                continue
+
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "стек недоступен"
+            metrics.LOOP_BLOCKS.inc()
+            logger.warning(f"Event loop заблокирован больше {blocked:.2f} s, стек:\n{stack}")
+
+    def quantiles(self) -> dict[float, float]:
+        if not self.samples:
+            return {}
+        ordered = sorted(self.samples)
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+    def collect(self) -> None:
+        for q, value in self.quantiles().items():
+            metrics.LOOP_LAG_QUANTILES.set(value, quantile=q)
@@ -1,16 +1,26 @@
 import asyncio
-from datetime import datetime
 
 import aiogram as io
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.telegram import TelegramAPIServer, PRODUCTION
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand, BotCommandScopeDefault
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from database.database import async_engine
+from database.database import async_engine, close_pg_pool
 from database.tables import Base
 from routers import admin, users, apsched, add_tournament, tournaments, pay_tournament, admin_tournament, libero_registration
+from routers.middlewares import HandlerMetricsMiddleware, HandlerLabelMiddleware, BotApiMetricsMiddleware, \
+    QueryStatsMiddleware, ProfilingMiddleware, LogContextMiddleware, \
+    OutboundChatMiddleware, OutboundQueueMiddleware, SkipUnchangedEditMiddleware, \
+    register_commands
+import metrics
+import runtime
+from bot_session import TunedAiohttpSession
+from loop_monitor import LoopLagMonitor
+from update_isolation import ChatEventIsolation
 
 from settings import settings
 
@@ -36,38 +46,108 @@ async def set_description(bot: io.Bot):
                                  "Для запуска нажмите \"Начать\"")
 
 
+def create_dispatcher(scheduler: AsyncIOScheduler) -> io.Dispatcher:
+    """Диспетчер со всеми роутерами и middleware (используется и в нагрузочных тестах)"""
+    storage = MemoryStorage()
+    # апдейты одного чата по очереди (два быстрых нажатия не гоняются в AsyncOrm и FSM), разных - параллельно
+    dispatcher = io.Dispatcher(storage=storage, events_isolation=ChatEventIsolation(settings.update_concurrency))
+
+    # id апдейта во всех записях логов, сделанных при его обработке
+    dispatcher.update.outer_middleware(LogContextMiddleware())
+    # приоритет ответов в чат апдейта над рассылками
+    dispatcher.update.outer_middleware(OutboundChatMiddleware())
+
+    # замер времени обработки апдейтов и количества SQL запросов по роутерам и префиксам callback_data
+    for observer in (dispatcher.message, dispatcher.callback_query):
+        observer.outer_middleware(ProfilingMiddleware())
+        observer.outer_middleware(HandlerMetricsMiddleware())
+        observer.outer_middleware(QueryStatsMiddleware())
+        observer.middleware(HandlerLabelMiddleware())
+
+    dispatcher["scheduler"] = scheduler
+
+    dispatcher.include_routers(admin.router, users.router, add_tournament.router, tournaments.router, pay_tournament.router,
+                               admin_tournament.router, libero_registration.router)
+    register_commands(dispatcher)
+    return dispatcher
+
+
+def create_session() -> TunedAiohttpSession:
+    """Сессия Bot API: свой адрес сервера (settings.bot_api_server), пул соединений и таймауты из settings,
+    orjson при settings.fast_runtime"""
+    json_loads, json_dumps = runtime.json_functions(settings.fast_runtime)
+    api = TelegramAPIServer.from_base(settings.bot_api_server) if settings.bot_api_server else PRODUCTION
+    return TunedAiohttpSession(
+        limit=settings.bot_api_connections,
+        keepalive_timeout=settings.bot_api_keepalive,
+        dns_ttl=settings.bot_api_dns_ttl,
+        timeout=settings.bot_api_timeout,
+        connect_timeout=settings.bot_api_connect_timeout,
+        method_timeouts=settings.bot_api_method_timeouts,
+        api=api,
+        json_loads=json_loads,
+        json_dumps=json_dumps,
+    )
+
+
 async def start_bot() -> None:
     """Запуск бота"""
-    bot = io.Bot(settings.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    bot = io.Bot(settings.bot_token, session=create_session(), default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    # edit_text без изменений не доходит до очереди и Bot API
+    bot.session.middleware(SkipUnchangedEditMiddleware(settings.rendered_messages_cache))
+    bot.session.middleware(OutboundQueueMiddleware())
+    bot.session.middleware(BotApiMetricsMiddleware())
     await set_commands(bot)
     await set_description(bot)
 
-    storage = MemoryStorage()
-    dispatcher = io.Dispatcher(storage=storage)
+    metrics_runner = await metrics.start_metrics_server(settings.metrics_host, settings.metrics_port) \
+        if settings.metrics_port else None
+    loop_monitor = LoopLagMonitor(settings.loop_lag_interval, settings.loop_lag_threshold)
+    loop_monitor.start()
 
     # # SCHEDULER
-    scheduler = AsyncIOScheduler(timezone="Europe/Moscow")
+    # задачи хранятся в БД и переживают перезапуск бота, пропущенные запуски выполняются один раз.
+    # хранилище синхронное (psycopg): пробуждения планировщика делают несколько запросов прямо в event loop,
+    # задержку видно в LOOP_LAG, замер - benchmarks.scheduler_store. Хендлеры ставят задачи в потоке (routers.apsched)
+    scheduler = AsyncIOScheduler(
+        timezone="Europe/Moscow",
+        jobstores={"default": SQLAlchemyJobStore(url=settings.db.SYNC_DATABASE_URL)},
+        job_defaults={
+            "misfire_grace_time": settings.scheduler_misfire_grace_time,
+            "coalesce": settings.scheduler_coalesce,
+            "max_instances": settings.scheduler_max_instances,
+        }
+    )
+    apsched.setup_bot(bot)
 
     # оповещение для пользователей + удаление старых неактивных событий 9 утра
-    scheduler.add_job(apsched.run_every_day, trigger="cron", year='*', month='*', day="*", hour=9, minute=0,
-                      second=0, start_date=datetime.now(), kwargs={"bot": bot})
+    scheduler.add_job(apsched.run_every_day, trigger="cron", id="run_every_day", replace_existing=True,
+                      year='*', month='*', day="*", hour=9, minute=0, second=0)
     # удаление команд не оплативших турнир за 4 дня в 4 утра
-    scheduler.add_job(apsched.kick_from_tournaments_by_payments, trigger="cron", year='*', month='*', day="*", hour=4,
-                      minute=0, second=0, start_date=datetime.now(), kwargs={"bot": bot})
-    # проверка мероприятия на минимальное кол-во участников + перевод событий в неактивные в 01 минуту
-    scheduler.add_job(apsched.run_every_hour, trigger="cron", year='*', month='*', day="*", hour="*", minute=1,
-                      second=0, start_date=datetime.now(), kwargs={"bot": bot})
+    scheduler.add_job(apsched.kick_from_tournaments_by_payments, trigger="cron", id="kick_from_tournaments_by_payments",
+                      replace_existing=True, year='*', month='*', day="*", hour=4, minute=0, second=0)
     # создание excel файла
-    scheduler.add_job(apsched.create_players_excel, trigger="cron", year='*', month='*', day="*", hour="*", minute="*/10",
-                      second=0, start_date=datetime.now())
+    scheduler.add_job(apsched.create_players_excel, trigger="cron", id="create_players_excel", replace_existing=True,
+                      year='*', month='*', day="*", hour="*", minute="*/10", second=0)
+    # контроль открытых соединений к БД
+    scheduler.add_job(apsched.watch_db_backends, trigger="cron", id="watch_db_backends", replace_existing=True,
+                      year='*', month='*', day="*", hour="*", minute="*/5", second=30)
 
-    scheduler.start()
+    # проверка мероприятий на минимальное кол-во участников + перевод в неактивные (разовые задачи на каждое событие)
+    await apsched.schedule_all_deadlines(scheduler)
 
-    dispatcher.include_routers(admin.router, users.router, add_tournament.router, tournaments.router, pay_tournament.router,
-                               admin_tournament.router, libero_registration.router)
+    scheduler.start()
+    dispatcher = create_dispatcher(scheduler)
     # await init_models()
 
-    await dispatcher.start_polling(bot)
+    try:
+        await dispatcher.start_polling(bot)
+    finally:
+        scheduler.shutdown(wait=False)
+        await loop_monitor.stop()
+        await close_pg_pool()
+        if metrics_runner:
+            await metrics_runner.cleanup()
 
 
 async def init_models():
@@ -77,4 +157,5 @@ async def init_models():
 
 
 if __name__ == "__main__":
+    runtime.install_event_loop(settings.fast_runtime)
     asyncio.run(start_bot())
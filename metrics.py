@@ -0,0 +1,270 @@
+import bisect
+import functools
+import inspect
+import time
+from typing import Any, Callable, Iterable
+
+from aiohttp import web
+
+from logger import logger, log_stats
+
+
+# границы бакетов гистограмм в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: dict[str, str] | None = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Базовая метрика с метками"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], Any] = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}, получено {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """Текущее значение, может как расти, так и уменьшаться"""
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """Распределение значений по бакетам, перцентили считаются в Prometheus через histogram_quantile"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # [счетчики по бакетам (+Inf последний), сумма, количество]
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, {"le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Набор метрик, которые отдаются на /metrics"""
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Функция, которая обновляет метрики перед каждой выгрузкой"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"Ошибка при сборе метрик в {collector.__name__}: {e}")
+
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_latency_seconds", "Время обработки апдейта хендлером", ("router", "prefix")
+)
+ORM_LATENCY = Histogram(
+    "bot_orm_latency_seconds", "Время выполнения методов AsyncOrm", ("method",)
+)
+BOT_API_LATENCY = Histogram(
+    "bot_api_latency_seconds", "Время выполнения запросов к Telegram Bot API", ("method",)
+)
+BOT_API_ERRORS = Counter(
+    "bot_api_errors_total", "Ошибки запросов к Telegram Bot API", ("method", "error")
+)
+BOT_API_IN_FLIGHT = Gauge(
+    "bot_api_in_flight_requests", "Запросы к Telegram Bot API в работе (без getUpdates)"
+)
+BOT_API_QUEUED = Gauge(
+    "bot_api_queued_requests", "Запросы к Telegram Bot API, ожидающие свободного соединения в пуле"
+)
+BOT_API_SKIPPED_EDITS = Counter(
+    "bot_api_skipped_edits_total", "Пропущенные edit_text без изменений текста и клавиатуры"
+)
+BOT_API_PRIORITY_QUEUE = Gauge(
+    "bot_api_priority_queue", "Запросы к Bot API, ожидающие очереди по лимиту запросов", ("priority",)
+)
+BOT_API_QUEUE_WAIT = Histogram(
+    "bot_api_queue_wait_seconds", "Ожидание очереди на отправку запроса к Bot API", ("priority",)
+)
+UPDATES_WAITING = Gauge(
+    "bot_updates_waiting", "Апдейты, ожидающие обработки предыдущих апдейтов чата или свободного слота"
+)
+UPDATES_ACTIVE = Gauge(
+    "bot_updates_active", "Апдейты в обработке"
+)
+UPDATE_CHATS = Gauge(
+    "bot_update_chats", "Чаты с апдейтами в обработке или ожидании"
+)
+UPDATE_QUEUE_WAIT = Histogram(
+    "bot_update_queue_wait_seconds", "Ожидание апдейта до начала обработки"
+)
+UPDATE_QUERIES = Histogram(
+    "bot_update_queries", "Количество SQL запросов за апдейт", ("router", "prefix"),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+)
+UPDATE_DB_TIME = Histogram(
+    "bot_update_db_seconds", "Суммарное время SQL запросов за апдейт", ("router", "prefix")
+)
+DB_BACKENDS = Gauge(
+    "bot_db_backends", "Открытые соединения к БД", ("kind",)
+)
+LOOP_LAG = Histogram(
+    "bot_event_loop_lag_seconds", "Задержка event loop относительно запланированного времени",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+LOOP_LAG_QUANTILES = Gauge(
+    "bot_event_loop_lag_quantile_seconds", "Перцентили задержки event loop по последним замерам", ("quantile",)
+)
+LOOP_BLOCKS = Counter(
+    "bot_event_loop_blocks_total", "Блокировки event loop дольше порога"
+)
+LOG_QUEUE = Gauge(
+    "bot_log_queue_size", "Записи логов в очереди фоновой записи"
+)
+LOG_DROPPED = Gauge(
+    "bot_log_dropped_records", "Записи логов, отброшенные из-за переполнения очереди (с запуска)", ("level",)
+)
+LOG_SAMPLED_OUT = Gauge(
+    "bot_log_sampled_out_records", "Записи логов, пропущенные сэмплированием (с запуска)"
+)
+
+
+def _collect_log_stats() -> None:
+    LOG_QUEUE.set(log_stats.queue_size)
+    LOG_SAMPLED_OUT.set(log_stats.sampled_out)
+    for level, count in log_stats.dropped.items():
+        LOG_DROPPED.set(count, level=level)
+
+
+REGISTRY.add_collector(_collect_log_stats)
+
+
+def instrument_class(cls: type, histogram: Histogram) -> type:
+    """Замер времени всех асинхронных статических методов класса"""
+    for name, attr in list(vars(cls).items()):
+        if isinstance(attr, staticmethod) and inspect.iscoroutinefunction(attr.__func__):
+            setattr(cls, name, staticmethod(_timed(attr.__func__, histogram)))
+    return cls
+
+
+def _timed(func: Callable, histogram: Histogram) -> Callable:
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start, method=func.__name__)
+
+    return wrapper
+
+
+async def _metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(body=REGISTRY.render().encode(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Запуск http сервера с метриками в формате Prometheus на /metrics"""
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
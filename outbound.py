@@ -0,0 +1,132 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import time
+from typing import Iterator
+
+from aiogram.methods import TelegramMethod, AnswerCallbackQuery, EditMessageText, EditMessageReplyMarkup, \
+    DeleteMessage, GetUpdates
+
+import metrics
+from settings import settings
+
+# классы приоритета исходящих запросов к Bot API, меньше - важнее
+INTERACTIVE = 0     # ответы пользователю, который сейчас нажимает кнопки
+ADMIN = 1           # оповещения админов
+BULK = 2            # рассылки и уведомления других пользователей
+PRIORITY_NAMES = {INTERACTIVE: "interactive", ADMIN: "admin", BULK: "bulk"}
+
+INTERACTIVE_METHODS = (AnswerCallbackQuery, EditMessageText, EditMessageReplyMarkup, DeleteMessage)
+
+# приоритет по умолчанию для сообщений пользователям (задачи планировщика), оповещения админов его не получают
+_default_priority: contextvars.ContextVar[int | None] = contextvars.ContextVar("outbound_default", default=None)
+# чат апдейта, который сейчас обрабатывается
+_update_chat: contextvars.ContextVar[str | None] = contextvars.ContextVar("outbound_update_chat", default=None)
+
+
+@contextlib.contextmanager
+def default_priority(value: int) -> Iterator[None]:
+    """Запросы к Bot API внутри блока идут с приоритетом value, кроме ответов в чат апдейта и оповещений админов"""
+    token = _default_priority.set(value)
+    try:
+        yield
+    finally:
+        _default_priority.reset(token)
+
+
+@contextlib.contextmanager
+def update_chat(chat_id: int | None) -> Iterator[None]:
+    """Чат обрабатываемого апдейта: ответы в него интерактивные, сообщения в другие чаты - уведомления"""
+    token = _update_chat.set(str(chat_id) if chat_id is not None else None)
+    try:
+        yield
+    finally:
+        _update_chat.reset(token)
+
+
+def is_admin_chat(chat_id: str) -> bool:
+    """Оповещения админов уходят и в ADMINS, и главному админу (подтверждения оплат)"""
+    return chat_id in settings.admins or chat_id == str(settings.main_admin_tg_id)
+
+
+def classify(method: TelegramMethod) -> int:
+    """Приоритет запроса по чату получателя и методу, приоритет по умолчанию блока - только для остальных"""
+    chat_id = getattr(method, "chat_id", None)
+    if chat_id is not None:
+        chat_id = str(chat_id)
+        if chat_id == _update_chat.get():
+            return INTERACTIVE
+        if is_admin_chat(chat_id):
+            return ADMIN
+
+    default = _default_priority.get()
+    if default is not None:
+        return default
+    if isinstance(method, INTERACTIVE_METHODS) or chat_id is None:
+        return INTERACTIVE
+    return BULK
+
+
+class PriorityRateLimiter:
+    """Общий лимит запросов в секунду (token bucket), свободные токены первыми получают более важные запросы"""
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: int) -> None:
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        metrics.BOT_API_PRIORITY_QUEUE.inc(priority=PRIORITY_NAMES[priority])
+        self._schedule()
+        try:
+            await future
+        finally:
+            metrics.BOT_API_PRIORITY_QUEUE.dec(priority=PRIORITY_NAMES[priority])
+
+    def _schedule(self) -> None:
+        if self._wakeup is None and self._waiters:
+            delay = max(0.0, (1 - self._tokens) / self.rate)
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._release)
+
+    def _release(self) -> None:
+        self._wakeup = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            # запрос мог быть отменен, пока ждал
+            if future.done():
+                continue
+            future.set_result(None)
+            self._tokens -= 1
+        self._schedule()
+
+
+limiter = PriorityRateLimiter(settings.bot_api_rate, settings.bot_api_burst)
+
+
+async def wait_turn(method: TelegramMethod) -> None:
+    """Ожидание очереди на отправку запроса с учетом приоритета"""
+    if isinstance(method, GetUpdates):
+        return
+
+    priority_class = classify(method)
+    start = time.perf_counter()
+    await limiter.acquire(priority_class)
+    metrics.BOT_API_QUEUE_WAIT.observe(time.perf_counter() - start, priority=PRIORITY_NAMES[priority_class])
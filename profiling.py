@@ -0,0 +1,114 @@
+import asyncio
+import contextvars
+import cProfile
+import datetime
+import io
+import os
+import pstats
+
+from database.query_stats import QueryStats
+from logger import log_folder, logger
+
+profiles_folder = os.path.join(log_folder, "profiles")
+
+
+class ProfilingSession:
+    """Профилирование следующих N апдейтов (всех или одного пользователя), включается командой /profile"""
+    def __init__(self, count: int, tg_id: int | None = None):
+        self.count = count
+        self.tg_id = tg_id
+        self.started_at = datetime.datetime.now()
+        self.files: list[str] = []
+
+    def matches(self, tg_id: int | None) -> bool:
+        return self.count > 0 and (self.tg_id is None or self.tg_id == tg_id)
+
+    def __str__(self) -> str:
+        target = f"пользователя {self.tg_id}" if self.tg_id else "всех пользователей"
+        return f"осталось {self.count} апдейтов {target}, сохранено профилей: {len(self.files)}"
+
+
+_session: ProfilingSession | None = None
+
+# cProfile профилирует весь поток, поэтому профилируемые апдейты выполняются по одному
+profile_lock = asyncio.Lock()
+
+# вызовы Bot API внутри профилируемого апдейта
+_bot_calls: contextvars.ContextVar[list[tuple[str, float]] | None] = contextvars.ContextVar("bot_calls", default=None)
+
+
+def start(count: int, tg_id: int | None = None) -> ProfilingSession:
+    global _session
+    _session = ProfilingSession(count, tg_id)
+    logger.info(f"Профилирование включено: {_session}")
+    return _session
+
+
+def stop() -> ProfilingSession | None:
+    global _session
+    session, _session = _session, None
+    return session
+
+
+def current() -> ProfilingSession | None:
+    return _session
+
+
+def take(tg_id: int | None) -> ProfilingSession | None:
+    """Сессия, если этот апдейт нужно профилировать (уменьшает счетчик оставшихся апдейтов)"""
+    global _session
+    session = _session
+    if session is None or not session.matches(tg_id):
+        return None
+
+    session.count -= 1
+    if session.count <= 0:
+        _session = None
+    return session
+
+
+def start_bot_calls() -> contextvars.Token:
+    return _bot_calls.set([])
+
+
+def record_bot_call(method: str, duration: float) -> None:
+    calls = _bot_calls.get()
+    if calls is not None:
+        calls.append((method, duration))
+
+
+def finish_bot_calls(token: contextvars.Token) -> list[tuple[str, float]]:
+    calls = _bot_calls.get() or []
+    _bot_calls.reset(token)
+    return calls
+
+
+def save_profile(session: ProfilingSession, label: str, profiler: cProfile.Profile, duration: float,
+                 queries: QueryStats, bot_calls: list[tuple[str, float]]) -> str:
+    """Сохранение pstats (для snakeviz) и текстового отчета с SQL и Bot API вызовами в logs/profiles"""
+    os.makedirs(profiles_folder, exist_ok=True)
+    path = os.path.join(profiles_folder, f"{datetime.datetime.now():%Y%m%d_%H%M%S_%f}_{label}")
+
+    profiler.dump_stats(f"{path}.prof")
+
+    report = io.StringIO()
+    report.write(f"{label}: {duration * 1000:.1f} ms, SQL: {queries.count} запросов "
+                 f"{queries.total_time * 1000:.1f} ms, Bot API: {len(bot_calls)} вызовов\n\n")
+
+    report.write("SQL:\n")
+    for query, args, elapsed in queries.statements or []:
+        report.write(f"  {elapsed * 1000:8.1f} ms  {' '.join(query.split())}  {args}\n")
+
+    report.write("\nBot API:\n")
+    for method, elapsed in bot_calls:
+        report.write(f"  {elapsed * 1000:8.1f} ms  {method}\n")
+
+    report.write("\nПрофиль (cumulative, топ 40):\n")
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(40)
+
+    with open(f"{path}.txt", "w", encoding="utf-8") as file:
+        file.write(report.getvalue())
+
+    session.files.append(path)
+    logger.info(f"Профиль апдейта {label} сохранен в {path}.prof ({duration * 1000:.1f} ms)")
+    return path
@@ -5,6 +5,7 @@ from aiogram import Router, types
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from database import schemas
 from database.orm import AsyncOrm
@@ -13,6 +14,7 @@ from settings import settings
 from routers.fsm_states import AddTournamentFSM
 from routers import keyboards as kb
 from routers import utils
+from routers import apsched
 
 
 router = Router()
@@ -272,7 +274,8 @@ async def add_tournament_date_handler(callback: types.CallbackQuery, state: FSMC
 
 
 @router.message(AddTournamentFSM.price)
-async def save_tournament_handler(message: types.Message, state: FSMContext, session: Any) -> None:
+async def save_tournament_handler(message: types.Message, state: FSMContext, session: Any,
+                                  scheduler: AsyncIOScheduler) -> None:
     """Сохранение price, создание Tournament"""
     price_str = message.text
     data = await state.get_data()
@@ -307,7 +310,10 @@ async def save_tournament_handler(message: types.Message, state: FSMContext, ses
         price=price_str
     )
 
-    await AsyncOrm.create_tournament(tournament, session)
+    tournament_id = await AsyncOrm.create_tournament(tournament, session)
+    if tournament_id:
+        new_tournament = schemas.Tournament(id=tournament_id, **tournament.model_dump())
+        await apsched.schedule_tournament_deadlines(scheduler, new_tournament)
 
     await state.clear()
     await message.answer(f"Турнир <b>\"{tournament.title}\"</b> <b>{date_time_str}</b> успешно создан ✅")
\ No newline at end of file
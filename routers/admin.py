@@ -5,7 +5,9 @@ from aiogram import Router, types, Bot
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+import profiling
 from database import schemas
 from database.orm import AsyncOrm
 from database.schemas import Tournament
@@ -16,6 +18,7 @@ from routers.fsm_states import AddEventFSM, AddTournamentFSM
 from routers import keyboards as kb
 from routers import utils
 from routers import messages as ms
+from routers import apsched
 
 router = Router()
 router.message.middleware.register(CheckPrivateMessageMiddleware())
@@ -99,12 +102,8 @@ async def event_delete_user_handler(callback: types.CallbackQuery, bot: Bot) ->
     await callback.message.edit_text("Пользователь удален с события ✅")
 
     # добор из резерва при удалении человека из основы
-    users_in_reserved = await AsyncOrm.get_reserved_users_by_event_id(event.id)
-    event_has_reserve = len(users_in_reserved) > 0
-    if event_has_reserve:
-        transfered_user = users_in_reserved[0].user
-        await AsyncOrm.transfer_from_reserve_to_event(event.id, transfered_user.id)
-
+    transfered_user = await AsyncOrm.transfer_first_from_reserve_to_event(event.id)
+    if transfered_user:
         # оповещение человека записанного из резерва
         notify_msg = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
                      f"Вы записаны на <b>{event.type}</b> {event.title} на " \
@@ -138,13 +137,14 @@ async def event_delete_handler(callback: types.CallbackQuery) -> None:
 
 
 @router.callback_query(lambda callback: callback.data.split("_")[0] == "admin-event-delete-confirm")
-async def event_delete_confirmed_handler(callback: types.CallbackQuery, bot: Bot) -> None:
+async def event_delete_confirmed_handler(callback: types.CallbackQuery, bot: Bot, scheduler: AsyncIOScheduler) -> None:
     """Удаление события админом"""
     event_id = int(callback.data.split("_")[1])
     # получаем event заранее для оповещения пользователей о его удалении
     events_with_users = await AsyncOrm.get_event_with_users(event_id)
     # удаляем event
     await AsyncOrm.delete_event(event_id)
+    await apsched.cancel_event_deadlines(scheduler, event_id)
 
     # оповещаем админа
     await callback.message.edit_text("Событие удалено ✅")
@@ -361,7 +361,7 @@ async def add_event_date_handler(callback: types.CallbackQuery, state: FSMContex
 
 
 @router.message(AddEventFSM.price)
-async def add_event_date_handler(message: types.Message, state: FSMContext) -> None:
+async def add_event_date_handler(message: types.Message, state: FSMContext, scheduler: AsyncIOScheduler) -> None:
     """Сохранение price, создание Event"""
     price_str = message.text
     data = await state.get_data()
@@ -390,7 +390,8 @@ async def add_event_date_handler(message: types.Message, state: FSMContext) -> N
         level=data["level"],
         price=int(price_str)
     )
-    await AsyncOrm.add_event(event)
+    new_event = await AsyncOrm.add_event(event)
+    await apsched.schedule_event_deadlines(scheduler, new_event)
 
     # удаление сообщения
     try:
@@ -571,3 +572,32 @@ async def players(message: types.Message) -> None:
         await write_excel_file(users)
     except Exception as e:
         print(f"Не получилось принудительно создать players.xlsx: {e}")
+
+
+@router.message(Command("profile"))
+async def profile_handler(message: types.Message) -> None:
+    """Профилирование апдейтов: /profile N, /profile user <tg_id> N, /profile off, /profile - статус"""
+    args = message.text.split()[1:]
+
+    if not args:
+        session = profiling.current()
+        await message.answer(f"Профилирование: {session}" if session else "Профилирование выключено")
+        return
+
+    if args[0] == "off":
+        session = profiling.stop()
+        await message.answer(f"Профилирование выключено, сохранено профилей: {len(session.files) if session else 0}")
+        return
+
+    try:
+        if args[0] == "user":
+            tg_id, count = int(args[1]), int(args[2]) if len(args) > 2 else 1
+        else:
+            tg_id, count = None, int(args[0])
+    except (ValueError, IndexError):
+        await message.answer("Формат: /profile N, /profile user <tg_id> N, /profile off")
+        return
+
+    count = max(1, min(count, settings.profile_max_updates))
+    session = profiling.start(count, tg_id)
+    await message.answer(f"Профилирование включено: {session}\nПрофили сохраняются в {profiling.profiles_folder}")
@@ -1,6 +1,7 @@
 from typing import Any, List
 
 from aiogram import Router, types, F, Bot
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from database.orm import AsyncOrm
 from database.schemas import TeamUsers, Tournament, User
@@ -10,6 +11,7 @@ from settings import settings
 from routers import messages as ms
 from routers import keyboards as kb
 from routers import utils
+from routers import apsched
 
 
 router = Router()
@@ -62,7 +64,8 @@ async def admin_delete_tournament(callback: types.CallbackQuery, session: Any) -
 
 
 @router.callback_query(F.data.split("_")[0] == "admin-t-delete-confirm")
-async def admin_delete_tournament_confirmed(callback: types.CallbackQuery, session: Any, bot: Bot) -> None:
+async def admin_delete_tournament_confirmed(callback: types.CallbackQuery, session: Any, bot: Bot,
+                                            scheduler: AsyncIOScheduler) -> None:
     """Удаление турнира"""
     admin_tg_id = str(callback.from_user.id)
     tournament_id = int(callback.data.split("_")[1])
@@ -72,6 +75,7 @@ async def admin_delete_tournament_confirmed(callback: types.CallbackQuery, sessi
     try:
         # удаляем турнир
         await AsyncOrm.delete_tournament(tournament_id, admin_tg_id, session)
+        await apsched.cancel_tournament_deadlines(scheduler, tournament_id)
 
         # ответ админу
         admin_msg = "Турнир удален ✅"
@@ -154,13 +158,10 @@ async def admin_delete_team_confirmed(callback: types.CallbackQuery, session: An
 
     # добор команды из резерва
     try:
-        # получаем команду
-        reserve_team: TeamUsers = await AsyncOrm.get_first_reserve_team(tournament_id, session)
+        # переводим первую команду из резерва в основу
+        reserve_team: TeamUsers | None = await AsyncOrm.transfer_first_reserve_team(tournament_id, session)
 
-        # меняем reserve на False
         if reserve_team:
-            await AsyncOrm.transfer_team_from_reserve(reserve_team.team_id, session)
-
             # оповещение участников команды переведенной из резерва
             converted_date = convert_date_named_month(tournament.date)
             msg = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
@@ -1,181 +1,260 @@
+import asyncio
 import datetime
-from typing import Any
+import functools
+import time
+from typing import Any, Callable, Awaitable, NamedTuple
 
 import aiogram
 import asyncpg
 import pytz
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+from database.database import get_pg_pool, pg_connection, db_backends
 from database.orm import AsyncOrm
+import metrics
+import outbound
 import routers.messages as ms
-from database.schemas import Tournament, TeamUsers, User, TournamentPayment
+from database.schemas import Tournament, TeamUsers, User, TournamentPayment, Event
 from routers import utils
 from settings import settings
 from routers.utils import write_excel_file
-
-
-async def run_every_day(bot: aiogram.Bot):
+from logger import logger
+
+
+# задачи хранятся в БД, поэтому бот не передается в kwargs задачи, а регистрируется при запуске
+_bot: aiogram.Bot | None = None
+
+
+def setup_bot(bot: aiogram.Bot) -> None:
+    """Регистрация бота для задач планировщика"""
+    global _bot
+    _bot = bot
+
+
+def tracked_job(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Запись времени выполнения и последнего успешного запуска задачи в scheduler_job_runs"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started_at = datetime.datetime.now()
+        start = time.perf_counter()
+        error = None
+        try:
+            # сообщения задач пользователям - рассылки, они не задерживают ответы пользователям.
+            # оповещения админов из задач идут с приоритетом админов (outbound.classify)
+            with outbound.default_priority(outbound.BULK):
+                return await func(*args, **kwargs)
+        except Exception as e:
+            error = repr(e)
+            logger.error(f"Ошибка при выполнении задачи {func.__name__}: {e}")
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            try:
+                await AsyncOrm.save_scheduler_job_run(func.__name__, started_at, duration, error)
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении запуска задачи {func.__name__}: {e}")
+
+    return wrapper
+
+
+class SubJob(NamedTuple):
+    """Подзадача составной задачи планировщика"""
+    name: str
+    func: Callable[[asyncpg.Connection], Awaitable[Any]]
+    depends_on: tuple[str, ...] = ()
+
+
+async def run_sub_jobs(sub_jobs: list[SubJob], pool: asyncpg.Pool, timeout: float) -> dict[str, bool]:
+    """Параллельный запуск подзадач, каждая на своем соединении из пула.
+    Подзадача стартует после завершения всех подзадач из depends_on (независимо от их результата)"""
+    names = {sub_job.name for sub_job in sub_jobs}
+    for sub_job in sub_jobs:
+        unknown = set(sub_job.depends_on) - names
+        if unknown:
+            raise ValueError(f"Подзадача {sub_job.name} зависит от неизвестных подзадач: {unknown}")
+
+    # проверка на циклические зависимости
+    resolved: set[str] = set()
+    pending = list(sub_jobs)
+    while pending:
+        ready = [sub_job for sub_job in pending if resolved.issuperset(sub_job.depends_on)]
+        if not ready:
+            raise ValueError(f"Циклическая зависимость подзадач: {[sub_job.name for sub_job in pending]}")
+        resolved.update(sub_job.name for sub_job in ready)
+        pending = [sub_job for sub_job in pending if sub_job not in ready]
+
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run(sub_job: SubJob) -> bool:
+        if sub_job.depends_on:
+            await asyncio.wait([tasks[name] for name in sub_job.depends_on])
+
+        try:
+            async with pool.acquire() as session:
+                await asyncio.wait_for(sub_job.func(session), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.error(f"Подзадача {sub_job.name} не завершилась за {timeout} сек")
+        except Exception as e:
+            logger.error(f"Ошибка при выполнении подзадачи {sub_job.name}: {e}")
+        return False
+
+    for sub_job in sub_jobs:
+        tasks[sub_job.name] = asyncio.create_task(run(sub_job), name=sub_job.name)
+
+    await asyncio.gather(*tasks.values())
+    return {name: task.result() for name, task in tasks.items()}
+
+
+@tracked_job
+async def run_every_day():
     """Запуск ежедневной проверки"""
-    session = await asyncpg.connect(
-        user=settings.db.postgres_user,
-        host=settings.db.postgres_host,
-        password=settings.db.postgres_password,
-        port=settings.db.postgres_port,
-        database=settings.db.postgres_db
-    )
-
-    await notify_users_about_events(bot, session)   # напоминание о событиях
-    await check_team_payment_for_tournament(session, bot)   # проверка команд турнира на наличие оплаты
-    await delete_old_events(session)    # удаление старых событий
-    await check_min_players_in_team(bot, session)   # проверка на количество игроков в команде
-
-
-async def run_every_hour(bot: aiogram.Bot) -> None:
-    """Выполняется каждый час"""
-    session = await asyncpg.connect(
-        user=settings.db.postgres_user,
-        host=settings.db.postgres_host,
-        password=settings.db.postgres_password,
-        port=settings.db.postgres_port,
-        database=settings.db.postgres_db
-    )
-
-    await update_events(bot, session)
-    await check_min_users_count(bot)
-    await check_min_team_count(bot, session)  # проверка на минимальное количество команд
-
-
-async def kick_from_tournaments_by_payments(bot: aiogram.Bot):
+    bot = _bot
+    pool = await get_pg_pool()
+
+    sub_jobs = [
+        # напоминание о событиях
+        SubJob("notify_users_about_events", functools.partial(notify_users_about_events, bot)),
+        # проверка команд турнира на наличие оплаты
+        SubJob("check_team_payment_for_tournament",
+               lambda session: check_team_payment_for_tournament(session, bot)),
+        # удаление старых событий
+        SubJob("delete_old_events", delete_old_events),
+        # проверка на количество игроков в команде, после напоминания капитанам об оплате
+        SubJob("check_min_players_in_team", functools.partial(check_min_players_in_team, bot),
+               depends_on=("check_team_payment_for_tournament",)),
+    ]
+
+    results = await run_sub_jobs(sub_jobs, pool, settings.scheduler_sub_job_timeout)
+    failed = [name for name, success in results.items() if not success]
+    if failed:
+        raise RuntimeError(f"Подзадачи завершились с ошибкой: {failed}")
+
+
+@tracked_job
+async def kick_from_tournaments_by_payments():
     """Ежедневное удаление команд, которые не оплатили турнир меньше чем за 4 дня"""
-    session = await asyncpg.connect(
-        user=settings.db.postgres_user,
-        host=settings.db.postgres_host,
-        password=settings.db.postgres_password,
-        port=settings.db.postgres_port,
-        database=settings.db.postgres_db
-    )
-
-    tournaments: list[Tournament] = await AsyncOrm.get_all_tournaments(10, session)
-    now = datetime.datetime.now(tz=pytz.timezone("Europe/Moscow"))
-
-    for tournament in tournaments:
-        if now + datetime.timedelta(days=settings.kick_team_without_pay_days) > \
-                tournament.date.astimezone(tz=pytz.timezone("Europe/Moscow")) - datetime.timedelta(hours=3):
-
-            teams: list[TeamUsers] = await AsyncOrm.get_teams_with_users(tournament.id, session)
+    bot = _bot
+    async with pg_connection() as session:
+        tournaments: list[Tournament] = await AsyncOrm.get_all_tournaments(10, session)
+        now = datetime.datetime.now(tz=pytz.timezone("Europe/Moscow"))
 
-            for team in teams:
-                payment = await AsyncOrm.get_tournament_payment_by_team_id(team.team_id, session)
+        for tournament in tournaments:
+            if now + datetime.timedelta(days=settings.kick_team_without_pay_days) > \
+                    tournament.date.astimezone(tz=pytz.timezone("Europe/Moscow")) - datetime.timedelta(hours=3):
 
-                # Если платеж не подтвержден и команда не в резерве
-                if not payment or (not team.reserve and not payment.paid_confirm):
+                teams: list[TeamUsers] = await AsyncOrm.get_teams_with_users(tournament.id, session)
 
-                    # удаляем команду с турнира
-                    await AsyncOrm.delete_team_from_tournament(team.team_id, None, session)
+                for team in teams:
+                    payment = await AsyncOrm.get_tournament_payment_by_team_id(team.team_id, session)
 
-                    # оповещаем игроков
-                    date = utils.convert_date(tournament.date)
-                    time = utils.convert_time(tournament.date)
-                    msg_for_user = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
-                                   f"Ваша команда <b>{team.title}</b> удалена с турнира {tournament.type} " \
-                                   f"\"{tournament.title}\" {date} {time}, так как участие не было оплачено\n\n" \
-                                   f"Для уточнения деталей вы можете связаться с администратором @{settings.main_admin_url}"
-                    for user in team.users:
-                        try:
-                            await bot.send_message(user.tg_id, msg_for_user)
-                        except:
-                            pass
+                    # Если платеж не подтвержден и команда не в резерве
+                    if not payment or (not team.reserve and not payment.paid_confirm):
 
-                    # добавляем команду из резерва, если резерв есть
-                    first_reserve_team: TeamUsers | None = await AsyncOrm.get_first_reserve_team(tournament.id, session)
-                    if first_reserve_team:
-                        # переводим из резерва в основу
-                        await AsyncOrm.transfer_team_from_reserve(team.team_id, session)
+                        # удаляем команду с турнира
+                        await AsyncOrm.delete_team_from_tournament(team.team_id, None, session)
 
-                        # TODO согласовать message
+                        # оповещаем игроков
                         date = utils.convert_date(tournament.date)
                         time = utils.convert_time(tournament.date)
-                        msg_for_users = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
-                                        f"Ваша команда <b>{team.title}</b> переведена из резерва в <b>основной состав</b> " \
-                                        f"на турнире {tournament.type} \"{tournament.title}\" {date} {time}\n\n" \
-                                        f"Капитану команды необходимо внести оплату в течение дня\n\n" \
-                                        f"Для уточнения деталей вы можете связаться с администратором @{settings.main_admin_url}"
-
-                        # оповещаем игроков команды
-                        for user in first_reserve_team.users:
+                        msg_for_user = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
+                                       f"Ваша команда <b>{team.title}</b> удалена с турнира {tournament.type} " \
+                                       f"\"{tournament.title}\" {date} {time}, так как участие не было оплачено\n\n" \
+                                       f"Для уточнения деталей вы можете связаться с администратором @{settings.main_admin_url}"
+                        for user in team.users:
                             try:
-                                await bot.send_message(user.tg_id, msg_for_users)
+                                await bot.send_message(user.tg_id, msg_for_user)
                             except:
                                 pass
 
-
-async def check_min_users_count(bot: aiogram.Bot):
-    """Проверка мероприятий на кол-во зареганых людей"""
-    active_events = await AsyncOrm.get_events(only_active=True)
-    now = datetime.datetime.now(tz=pytz.timezone("Europe/Moscow"))
-
-    for event in active_events:
-        # now + datetime.timedelta(hours=2, seconds=10) - текущее время + 2 часа
-        # event.date.astimezone(tz=pytz.timezone("Europe/Moscow")) - datetime.timedelta(hours=3) - перевод даты в текущее время по мск
-        if now + datetime.timedelta(hours=2) > \
-                event.date.astimezone(tz=pytz.timezone("Europe/Moscow")) - datetime.timedelta(hours=3):
-            event_with_users = await AsyncOrm.get_event_with_users(event.id)
-            user_registered_count = len(event_with_users.users_registered)
-
-            if event.min_user_count > user_registered_count:
-                # переводим мероприятие в неактивные
-                await AsyncOrm.update_event_status_to_false(event.id)
-
-                # оповещаем пользователей
-                msg = ms.notify_canceled_event(event_with_users)
-                for user in event_with_users.users_registered:
-
-                    await bot.send_message(user.tg_id, msg)
-
-
-async def check_min_team_count(bot: aiogram.Bot, session: Any):
-    """Проверка на количество зарегистрированных команд на турнир"""
-    tournaments: list[Tournament] = await AsyncOrm.get_all_tournaments(2, session)
-    now = datetime.datetime.now(tz=pytz.timezone("Europe/Moscow"))
-
-    for tournament in tournaments:
-        if now + datetime.timedelta(hours=settings.tournament_min_team_hours) > \
-            tournament.date.astimezone(tz=pytz.timezone("Europe/Moscow")) - datetime.timedelta(hours=3):
-
-            teams: list[TeamUsers] = await AsyncOrm.get_teams_with_users(tournament.id, session)
-            # если недостаточно команд
-            if len(teams) < tournament.min_team_count:
-                # меняем статус турнира на неактивный
-                await AsyncOrm.update_tournament_status_to_false(tournament.id, session)
-
-                date = utils.convert_date(tournament.date)
-                time = utils.convert_time(tournament.date)
-                msg = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
-                      f"Турнир <b>{tournament.type}</b> \"{tournament.title}\" {date} {time} отменен в связи с " \
-                      f"недостаточным количеством зарегистрированных команд\n\n" \
-                      f"Для возврата денежных средств свяжитесь с администратором @{settings.main_admin_url}"
-
-                # оповещаем участников
-                for team in teams:
-                    for user in team.users:
-                        try:
-                            await bot.send_message(user.tg_id, msg)
-                        except:
-                            pass
-
-                # оповещаем админа
-                msg_for_admin = f"Турнир <b>{tournament.type}</b> \"{tournament.title}\" {date} {time} отменен в связи с " \
-                                f"недостаточным количеством зарегистрированных команд\n\n" \
-                                f"Необходимо вернуть деньги следующим капитанам <b>команд</b>:\n"
-                for team in teams:
-                    team_leader: User = await AsyncOrm.get_user_by_id(team.team_leader_id)
-                    msg_for_admin += f"<a href='tg://user?id={team_leader.tg_id}'>{team_leader.firstname} {team_leader.lastname}</a> " \
-                                     f"(команда <b>{team.title}</b>) - {tournament.price} руб.\n"
-
+                        # переводим первую команду из резерва в основу, если резерв есть
+                        first_reserve_team: TeamUsers | None = await AsyncOrm.transfer_first_reserve_team(tournament.id, session)
+                        if first_reserve_team:
+                            # TODO согласовать message
+                            date = utils.convert_date(tournament.date)
+                            time = utils.convert_time(tournament.date)
+                            msg_for_users = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
+                                            f"Ваша команда <b>{first_reserve_team.title}</b> переведена из резерва в <b>основной состав</b> " \
+                                            f"на турнире {tournament.type} \"{tournament.title}\" {date} {time}\n\n" \
+                                            f"Капитану команды необходимо внести оплату в течение дня\n\n" \
+                                            f"Для уточнения деталей вы можете связаться с администратором @{settings.main_admin_url}"
+
+                            # оповещаем игроков команды
+                            for user in first_reserve_team.users:
+                                try:
+                                    await bot.send_message(user.tg_id, msg_for_users)
+                                except:
+                                    pass
+
+
+@tracked_job
+async def check_event_min_users(event_id: int) -> None:
+    """Проверка события на минимальное кол-во зарегистрированных людей (за 2 часа до начала)"""
+    bot = _bot
+    event_with_users = await AsyncOrm.get_event_with_users(event_id)
+    # событие могли удалить до срабатывания задачи
+    if not event_with_users or not event_with_users.active:
+        return
+
+    if event_with_users.min_user_count > len(event_with_users.users_registered):
+        # переводим мероприятие в неактивные
+        await AsyncOrm.update_event_status_to_false(event_id)
+
+        # оповещаем пользователей
+        msg = ms.notify_canceled_event(event_with_users)
+        for user in event_with_users.users_registered:
+            try:
+                await bot.send_message(user.tg_id, msg)
+            except:
+                pass
+
+
+@tracked_job
+async def check_tournament_min_teams(tournament_id: int) -> None:
+    """Проверка турнира на минимальное количество зарегистрированных команд"""
+    bot = _bot
+    async with pg_connection() as session:
+        tournament: Tournament | None = await AsyncOrm.get_tournament_by_id(tournament_id, session)
+        if not tournament or not tournament.active:
+            return
+
+        teams: list[TeamUsers] = await AsyncOrm.get_teams_with_users(tournament.id, session)
+        # если команд достаточно
+        if len(teams) >= tournament.min_team_count:
+            return
+
+        # меняем статус турнира на неактивный
+        await AsyncOrm.update_tournament_status_to_false(tournament.id, session)
+
+        date = utils.convert_date(tournament.date)
+        time = utils.convert_time(tournament.date)
+        msg = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
+              f"Турнир <b>{tournament.type}</b> \"{tournament.title}\" {date} {time} отменен в связи с " \
+              f"недостаточным количеством зарегистрированных команд\n\n" \
+              f"Для возврата денежных средств свяжитесь с администратором @{settings.main_admin_url}"
+
+        # оповещаем участников
+        for team in teams:
+            for user in team.users:
                 try:
-                    await bot.send_message(settings.main_admin_tg_id, msg_for_admin)
+                    await bot.send_message(user.tg_id, msg)
                 except:
                     pass
 
+        # оповещаем админа
+        msg_for_admin = f"Турнир <b>{tournament.type}</b> \"{tournament.title}\" {date} {time} отменен в связи с " \
+                        f"недостаточным количеством зарегистрированных команд\n\n" \
+                        f"Необходимо вернуть деньги следующим капитанам <b>команд</b>:\n"
+        for team in teams:
+            team_leader: User = await AsyncOrm.get_user_by_id(team.team_leader_id)
+            msg_for_admin += f"<a href='tg://user?id={team_leader.tg_id}'>{team_leader.firstname} {team_leader.lastname}</a> " \
+                             f"(команда <b>{team.title}</b>) - {tournament.price} руб.\n"
+
+        try:
+            await bot.send_message(settings.main_admin_tg_id, msg_for_admin)
+        except:
+            pass
+
 
 async def check_min_players_in_team(bot: aiogram.Bot, session: Any):
     """Проверка комплектности команды"""
@@ -228,10 +307,8 @@ async def check_min_players_in_team(bot: aiogram.Bot, session: Any):
                             pass
 
                     # переводим из резерва в основу
-                    first_reserve_team: TeamUsers | None = await AsyncOrm.get_first_reserve_team(tournament.id, session)
+                    first_reserve_team: TeamUsers | None = await AsyncOrm.transfer_first_reserve_team(tournament.id, session)
                     if first_reserve_team:
-                        await AsyncOrm.transfer_team_from_reserve(first_reserve_team.team_id, session)
-
                         date = utils.convert_date(tournament.date)
                         time = utils.convert_time(tournament.date)
                         msg_for_users = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
@@ -248,68 +325,67 @@ async def check_min_players_in_team(bot: aiogram.Bot, session: Any):
                                 pass
 
 
-async def update_events(bot: aiogram.Bot, session: Any):
-    """Изменение статуса прошедших событий"""
-    # Для обычных событий (тренировок, игр и тд.)
-    events = await AsyncOrm.get_events()
-    for event in events:
-        # сравниваем текущее время + 1 ч с временем события
-        # перевод события в неактивное через 1 ч после его начала
-        if datetime.datetime.now(tz=pytz.timezone("Europe/Moscow")) - datetime.timedelta(hours=1) > \
-                event.date.astimezone(tz=pytz.timezone("Europe/Moscow")) - datetime.timedelta(hours=3):
-            await AsyncOrm.update_event_status_to_false(event.id)
-
-            # отправляем администратору список людей резерва, для возвращения оплаты
-            reserve_users = await AsyncOrm.get_reserved_users_by_event_id(event.id)
-            if reserve_users:
-                date = utils.convert_date(event.date)
-                time = utils.convert_time(event.date)
-                msg_for_admin = f"Необходимо вернуть деньги следующим <b>пользователям из резерва</b> " \
-                      f"на событие {event.type} \"{event.title}\" {date} в {time}:\n\n"
-                for user in reserve_users:
-                    msg_for_admin += f"<a href='tg://user?id={user.user.tg_id}'>{user.user.firstname} {user.user.lastname}</a> - {event.price} руб.\n"
-
-                # отправляем сообщение администратору
-                try:
-                    await bot.send_message(settings.main_admin_tg_id, msg_for_admin)
-                except:
-                    pass
-
-    # Только для турниров
-    tournaments: list[Tournament] = await AsyncOrm.get_all_tournaments(1, session)
-
-    for tournament in tournaments:
-        # сравниваем текущее время + 1 ч с временем события
-        # перевод события в неактивное через 1 ч после его начала
-        if datetime.datetime.now(tz=pytz.timezone("Europe/Moscow")) - datetime.timedelta(hours=1) > \
-                tournament.date.astimezone(tz=pytz.timezone("Europe/Moscow")) - datetime.timedelta(hours=3):
-            await AsyncOrm.update_tournament_status_to_false(tournament.id, session)
-
-            # Получаем команды из резерва на этом турнире
-            teams: list[TeamUsers] = await AsyncOrm.get_teams_with_users(tournament.id, session)
-            reserve_teams: list[TeamUsers] = []
-            for team in teams:
-                if team.reserve:
-                    reserve_teams.append(team)
-
-            # Отправляем админу список капитанов команд, которые были в резерве и не попали на турнир
-            if reserve_teams:
-                date = utils.convert_date(tournament.date)
-                time = utils.convert_time(tournament.date)
-
-                msg_for_admin = f"Необходимо вернуть деньги следующим капитанам <b>команд из резерва</b> " \
-                                f"с турнира {tournament.type} \"{tournament.title}\" {date} в {time}:\n\n"
-
-                for team in reserve_teams:
-                    team_leader: User = await AsyncOrm.get_user_by_id(team.team_leader_id)
-                    msg_for_admin += f"<a href='tg://user?id={team_leader.tg_id}'>{team_leader.firstname} {team_leader.lastname}</a> " \
-                                     f"(команда <b>{team.title}</b>) - {tournament.price} руб.\n"
-
-                # отправляем сообщение администратору
-                try:
-                    await bot.send_message(settings.main_admin_tg_id, msg_for_admin)
-                except:
-                    pass
+@tracked_job
+async def deactivate_event(event_id: int) -> None:
+    """Перевод события в неактивное через 1 ч после его начала"""
+    bot = _bot
+    event = await AsyncOrm.get_event_by_id(event_id)
+    # событие могли удалить до срабатывания задачи
+    if not event or not event.active:
+        return
+
+    await AsyncOrm.update_event_status_to_false(event.id)
+
+    # отправляем администратору список людей резерва, для возвращения оплаты
+    reserve_users = await AsyncOrm.get_reserved_users_by_event_id(event.id)
+    if reserve_users:
+        date = utils.convert_date(event.date)
+        time = utils.convert_time(event.date)
+        msg_for_admin = f"Необходимо вернуть деньги следующим <b>пользователям из резерва</b> " \
+              f"на событие {event.type} \"{event.title}\" {date} в {time}:\n\n"
+        for user in reserve_users:
+            msg_for_admin += f"<a href='tg://user?id={user.user.tg_id}'>{user.user.firstname} {user.user.lastname}</a> - {event.price} руб.\n"
+
+        # отправляем сообщение администратору
+        try:
+            await bot.send_message(settings.main_admin_tg_id, msg_for_admin)
+        except:
+            pass
+
+
+@tracked_job
+async def deactivate_tournament(tournament_id: int) -> None:
+    """Перевод турнира в неактивные через 1 ч после его начала"""
+    bot = _bot
+    async with pg_connection() as session:
+        tournament: Tournament | None = await AsyncOrm.get_tournament_by_id(tournament_id, session)
+        if not tournament or not tournament.active:
+            return
+
+        await AsyncOrm.update_tournament_status_to_false(tournament.id, session)
+
+        # Получаем команды из резерва на этом турнире
+        teams: list[TeamUsers] = await AsyncOrm.get_teams_with_users(tournament.id, session)
+        reserve_teams: list[TeamUsers] = [team for team in teams if team.reserve]
+
+        # Отправляем админу список капитанов команд, которые были в резерве и не попали на турнир
+        if reserve_teams:
+            date = utils.convert_date(tournament.date)
+            time = utils.convert_time(tournament.date)
+
+            msg_for_admin = f"Необходимо вернуть деньги следующим капитанам <b>команд из резерва</b> " \
+                            f"с турнира {tournament.type} \"{tournament.title}\" {date} в {time}:\n\n"
+
+            for team in reserve_teams:
+                team_leader: User = await AsyncOrm.get_user_by_id(team.team_leader_id)
+                msg_for_admin += f"<a href='tg://user?id={team_leader.tg_id}'>{team_leader.firstname} {team_leader.lastname}</a> " \
+                                 f"(команда <b>{team.title}</b>) - {tournament.price} руб.\n"
+
+            # отправляем сообщение администратору
+            try:
+                await bot.send_message(settings.main_admin_tg_id, msg_for_admin)
+            except:
+                pass
 
 
 async def notify_users_about_events(bot: aiogram.Bot, session: Any):
@@ -384,7 +460,103 @@ async def check_team_payment_for_tournament(session: Any, bot: aiogram.Bot) -> N
                             pass
 
 
+@tracked_job
+async def watch_db_backends():
+    """Контроль количества открытых соединений к БД"""
+    pool = await get_pg_pool()
+    async with pool.acquire() as session:
+        counts = await AsyncOrm.get_open_backends_count(session)
+    if counts is None:
+        return
+
+    total, own = counts
+    db_backends.update(total=total, own=own, pool_size=pool.get_size(), pool_idle=pool.get_idle_size())
+    for kind, value in db_backends.items():
+        metrics.DB_BACKENDS.set(value, kind=kind)
+    logger.info(f"Соединений к БД: всего {total}, бота {own}, в пуле {pool.get_size()} (свободно {pool.get_idle_size()})")
+
+    if own > settings.db_backends_warning:
+        logger.warning(f"Бот держит {own} соединений к БД (порог {settings.db_backends_warning}), возможна утечка")
+
+
+@tracked_job
 async def create_players_excel():
     """Создание файла с игроками"""
     users = await AsyncOrm.get_all_players_info()
     await write_excel_file(users)
+
+
+# DEADLINES
+def _run_date(deadline: datetime.datetime) -> datetime.datetime:
+    """Время запуска задачи, пропущенные дедлайны выполняются сразу"""
+    # даты событий хранятся без часового пояса по мск
+    now = datetime.datetime.now(tz=pytz.timezone("Europe/Moscow")).replace(tzinfo=None)
+    return max(deadline, now)
+
+
+def _schedule_event_deadlines(scheduler: AsyncIOScheduler, event: Event) -> None:
+    scheduler.add_job(check_event_min_users, trigger="date", id=f"event-min-users_{event.id}", replace_existing=True,
+                      run_date=_run_date(event.date - datetime.timedelta(hours=2)),
+                      kwargs={"event_id": event.id})
+    scheduler.add_job(deactivate_event, trigger="date", id=f"event-deactivate_{event.id}", replace_existing=True,
+                      run_date=_run_date(event.date + datetime.timedelta(hours=1)),
+                      kwargs={"event_id": event.id})
+
+
+def _cancel_event_deadlines(scheduler: AsyncIOScheduler, event_id: int) -> None:
+    for job_id in (f"event-min-users_{event_id}", f"event-deactivate_{event_id}"):
+        if scheduler.get_job(job_id):
+            scheduler.remove_job(job_id)
+
+
+def _schedule_tournament_deadlines(scheduler: AsyncIOScheduler, tournament: Tournament) -> None:
+    scheduler.add_job(check_tournament_min_teams, trigger="date", id=f"tournament-min-teams_{tournament.id}",
+                      replace_existing=True,
+                      run_date=_run_date(tournament.date - datetime.timedelta(hours=settings.tournament_min_team_hours)),
+                      kwargs={"tournament_id": tournament.id})
+    scheduler.add_job(deactivate_tournament, trigger="date", id=f"tournament-deactivate_{tournament.id}",
+                      replace_existing=True,
+                      run_date=_run_date(tournament.date + datetime.timedelta(hours=1)),
+                      kwargs={"tournament_id": tournament.id})
+
+
+def _cancel_tournament_deadlines(scheduler: AsyncIOScheduler, tournament_id: int) -> None:
+    for job_id in (f"tournament-min-teams_{tournament_id}", f"tournament-deactivate_{tournament_id}"):
+        if scheduler.get_job(job_id):
+            scheduler.remove_job(job_id)
+
+
+# хранилище задач работает через синхронный psycopg, поэтому вызовы планировщика из хендлеров
+# выполняются в потоке, а не в event loop (методы планировщика потокобезопасны)
+async def schedule_event_deadlines(scheduler: AsyncIOScheduler, event: Event) -> None:
+    """Постановка (или перенос) задач события: проверка кол-ва участников и перевод в неактивные"""
+    await asyncio.to_thread(_schedule_event_deadlines, scheduler, event)
+
+
+async def cancel_event_deadlines(scheduler: AsyncIOScheduler, event_id: int) -> None:
+    """Отмена задач удаленного события"""
+    await asyncio.to_thread(_cancel_event_deadlines, scheduler, event_id)
+
+
+async def schedule_tournament_deadlines(scheduler: AsyncIOScheduler, tournament: Tournament) -> None:
+    """Постановка (или перенос) задач турнира: проверка кол-ва команд и перевод в неактивные"""
+    await asyncio.to_thread(_schedule_tournament_deadlines, scheduler, tournament)
+
+
+async def cancel_tournament_deadlines(scheduler: AsyncIOScheduler, tournament_id: int) -> None:
+    """Отмена задач удаленного турнира"""
+    await asyncio.to_thread(_cancel_tournament_deadlines, scheduler, tournament_id)
+
+
+async def schedule_all_deadlines(scheduler: AsyncIOScheduler) -> None:
+    """Постановка задач для всех активных событий и турниров при запуске бота"""
+    events: list[Event] = await AsyncOrm.get_events(only_active=True)
+    # планировщик еще не запущен, задачи только накапливаются и пишутся в БД при scheduler.start()
+    for event in events:
+        _schedule_event_deadlines(scheduler, event)
+
+    async with pg_connection() as session:
+        tournaments: list[Tournament] = await AsyncOrm.get_all_tournaments_by_status(session, active=True)
+
+    for tournament in tournaments:
+        _schedule_tournament_deadlines(scheduler, tournament)
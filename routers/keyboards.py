@@ -5,8 +5,8 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from functools import wraps
 from typing import Callable, List
 
-from database.schemas import Event, User, EventRel, PaymentsEventsUsers, Payment, ReservedEvent, Tournament, \
-    TeamUsers, TournamentTeams, TournamentPayment, TournamentPaid
+from database.schemas import Event, User, EventRel, Payment, ReservedEvent, Tournament, \
+    TeamUsers, TournamentTeams, TournamentPayment, TournamentPaid, MyEvent
 from routers.utils import convert_date, convert_time, get_weekday_from_date
 from settings import settings
 
@@ -179,18 +179,16 @@ def confirm_choose_gender_keyboard(gender: str) -> InlineKeyboardBuilder:
 
 
 @back_button("user-menu")
-def user_events(events: list[PaymentsEventsUsers | Tournament],
-                reserved_events: list[ReservedEvent]) -> InlineKeyboardBuilder:
+def user_events(events: list[MyEvent]) -> InlineKeyboardBuilder:
     """Мероприятия куда пользователь зарегистрирован"""
     keyboard = InlineKeyboardBuilder()
-    reserved_events_ids = [reserve.event.id for reserve in reserved_events]
 
     for event in events:
-        # для турниров
-        if type(event) == Tournament:
-            date = convert_date(event.date)
-            weekday = settings.weekdays[datetime.datetime.weekday(event.date)]
+        date = convert_date(event.date)
+        weekday = settings.weekdays[datetime.datetime.weekday(event.date)]
 
+        # для турниров
+        if event.kind == "tournament":
             keyboard.row(InlineKeyboardButton(
                 text=f"🏆 {date} ({weekday}) {event.type}",
                 callback_data=f"my-tournament_{event.id}")
@@ -198,10 +196,7 @@ def user_events(events: list[PaymentsEventsUsers | Tournament],
 
         # для остальных мероприятий
         else:
-            date = convert_date(event.event.date)
-            weekday = settings.weekdays[datetime.datetime.weekday(event.event.date)]
-
-            if event.event.id in reserved_events_ids:
+            if event.reserved:
                 status = "📝"
             elif event.paid_confirm:
                 status = "✅️"
@@ -209,7 +204,7 @@ def user_events(events: list[PaymentsEventsUsers | Tournament],
                 status = "⏳"
 
             keyboard.row(InlineKeyboardButton(
-                text=f"{status} {date} ({weekday}) {event.event.type}",
+                text=f"{status} {date} ({weekday}) {event.type}",
                 callback_data=f"my-events_{event.id}")
             )
 
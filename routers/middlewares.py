@@ -1,9 +1,21 @@
+import collections
+import cProfile
+import time
 from typing import Callable, Dict, Any, Awaitable, List
 
 import asyncpg
-from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram import BaseMiddleware, Bot, Router
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.filters import Command
+from aiogram.methods import TelegramMethod, EditMessageText, SendMessage
+from aiogram.methods.base import TelegramType, Response
+from aiogram.types import TelegramObject, CallbackQuery, Message
 
+import metrics
+import outbound
+import profiling
+from database.query_stats import TrackedConnection, track_queries
+from logger import logger
 from settings import settings
 
 
@@ -59,10 +71,246 @@ class DatabaseMiddleware(BaseMiddleware):
             host=settings.db.postgres_host,
             password=settings.db.postgres_password,
             port=settings.db.postgres_port,
-            database=settings.db.postgres_db
+            database=settings.db.postgres_db,
+            server_settings={"application_name": settings.db.application_name},
+            connection_class=TrackedConnection,
         )
         try:
             data["session"] = conn
             return await handler(event, data)
         finally:
             await conn.close()
+
+
+# команды хендлеров бота (заполняет register_commands), любая другая "/..." в метриках - просто "command",
+# иначе пользователи могли бы создавать новые метки метрик без ограничений
+_commands: set[str] = set()
+
+
+def register_commands(router: Router) -> None:
+    """Запоминает команды хендлеров сообщений роутера и всех вложенных роутеров"""
+    for sub_router in router.chain_tail:
+        for handler_object in sub_router.message.handlers:
+            for filter_object in handler_object.filters or ():
+                command_filter = filter_object.callback
+                if isinstance(command_filter, Command):
+                    _commands.update(prefix + command for prefix in command_filter.prefix
+                                     for command in command_filter.commands if isinstance(command, str))
+
+
+def _update_prefix(event: TelegramObject) -> str:
+    """Префикс callback_data или команда сообщения, по нему группируются замеры"""
+    if isinstance(event, CallbackQuery):
+        data = event.data or ""
+        return data.split("|")[0].split("_")[0]
+    if isinstance(event, Message):
+        if event.text and event.text.startswith("/"):
+            command = event.text.split()[0].split("@")[0]
+            return command if command in _commands else "command"
+        return "message"
+    return type(event).__name__
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Замер времени обработки апдейта (outer middleware диспетчера).
+    Роутер хендлера проставляет HandlerLabelMiddleware"""
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        labels = {"router": "unhandled"}
+        data["metrics_labels"] = labels
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            metrics.HANDLER_LATENCY.observe(time.perf_counter() - start,
+                                            router=labels["router"], prefix=_update_prefix(event))
+
+
+class QueryStatsMiddleware(BaseMiddleware):
+    """Подсчет SQL запросов и времени БД за апдейт, предупреждение о повторяющихся запросах (N+1).
+    Регистрируется после HandlerMetricsMiddleware, чтобы получить метки роутера"""
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        prefix = _update_prefix(event)
+        with track_queries(prefix) as stats:
+            try:
+                return await handler(event, data)
+            finally:
+                router = data.get("metrics_labels", {}).get("router", "unhandled")
+                metrics.UPDATE_QUERIES.observe(stats.count, router=router, prefix=prefix)
+                metrics.UPDATE_DB_TIME.observe(stats.total_time, router=router, prefix=prefix)
+
+                for shape, count in stats.repeated(settings.n_plus_one_threshold).items():
+                    logger.warning(f"Возможен N+1 в {router}:{prefix}: запрос выполнен {count} раз: {shape}")
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """Проставляет update_id во все записи логов, сделанные при обработке апдейта (outer middleware update)"""
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        with logger.contextualize(update_id=event.update_id):
+            return await handler(event, data)
+
+
+class OutboundChatMiddleware(BaseMiddleware):
+    """Запоминает чат апдейта: ответы в него отправляются с интерактивным приоритетом (outer middleware update)"""
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        chat = data.get("event_chat") or data.get("event_from_user")
+        with outbound.update_chat(chat.id if chat else None):
+            return await handler(event, data)
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """Профилирование апдейтов, выбранных командой /profile: cProfile, SQL запросы и вызовы Bot API.
+    Регистрируется первым outer middleware, чтобы учитывать время остальных middleware"""
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        session = profiling.take(user.id if user else None)
+        if session is None:
+            return await handler(event, data)
+
+        prefix = _update_prefix(event)
+        async with profiling.profile_lock:
+            profiler = cProfile.Profile()
+            bot_calls_token = profiling.start_bot_calls()
+            with track_queries(prefix, capture=True) as stats:
+                start = time.perf_counter()
+                profiler.enable()
+                try:
+                    return await handler(event, data)
+                finally:
+                    profiler.disable()
+                    duration = time.perf_counter() - start
+                    bot_calls = profiling.finish_bot_calls(bot_calls_token)
+                    try:
+                        profiling.save_profile(session, prefix.lstrip("/"), profiler, duration, stats, bot_calls)
+                    except Exception as e:
+                        logger.error(f"Не удалось сохранить профиль апдейта {prefix}: {e}")
+
+
+class HandlerLabelMiddleware(BaseMiddleware):
+    """Запоминает роутер сработавшего хендлера для HandlerMetricsMiddleware (inner middleware диспетчера)"""
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        labels = data.get("metrics_labels")
+        if labels is not None:
+            labels["router"] = data["handler"].callback.__module__.rsplit(".", 1)[-1]
+        return await handler(event, data)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """Замер времени запросов к Telegram Bot API"""
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        method_name = type(method).__name__
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            metrics.BOT_API_ERRORS.inc(method=method_name, error=type(e).__name__)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            metrics.BOT_API_LATENCY.observe(duration, method=method_name)
+            profiling.record_bot_call(method_name, duration)
+
+
+class OutboundQueueMiddleware(BaseRequestMiddleware):
+    """Очередь запросов к Bot API по общему лимиту: интерактивные ответы, затем оповещения админов, затем рассылки.
+    Регистрируется первой, чтобы BotApiMetricsMiddleware замерял только время самого запроса"""
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        await outbound.wait_turn(method)
+        return await make_request(bot, method)
+
+
+class SkipUnchangedEditMiddleware(BaseRequestMiddleware):
+    """Пропуск edit_text, если текст и клавиатура совпадают с уже показанными в сообщении.
+    Вместо ошибки "message is not modified" и лишнего запроса возвращается прошлый результат"""
+    content_fields = {"text", "parse_mode", "entities", "link_preview_options", "disable_web_page_preview",
+                      "reply_markup"}
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # ключ сообщения -> (хэш текста и клавиатуры, результат последней отправки или изменения)
+        self.rendered: collections.OrderedDict[Any, tuple[int, Any]] = collections.OrderedDict()
+
+    @staticmethod
+    def _key(method: TelegramMethod) -> Any:
+        inline_message_id = getattr(method, "inline_message_id", None)
+        if inline_message_id:
+            return inline_message_id
+        return str(getattr(method, "chat_id", None)), getattr(method, "message_id", None)
+
+    def _content_hash(self, method: TelegramMethod) -> int:
+        return hash(repr(method.model_dump(include=self.content_fields, exclude_none=True)))
+
+    def _remember(self, key: Any, content_hash: int, result: Any) -> None:
+        self.rendered[key] = (content_hash, result)
+        self.rendered.move_to_end(key)
+        if len(self.rendered) > self.max_size:
+            self.rendered.popitem(last=False)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if isinstance(method, SendMessage):
+            result = await make_request(bot, method)
+            self._remember((str(method.chat_id), result.message_id), self._content_hash(method), result)
+            return result
+
+        if not isinstance(method, EditMessageText):
+            # остальные изменения (клавиатура, подпись, удаление) делают запомненное содержимое неактуальным
+            if hasattr(method, "message_id") or hasattr(method, "inline_message_id"):
+                self.rendered.pop(self._key(method), None)
+            return await make_request(bot, method)
+
+        key = self._key(method)
+        content_hash = self._content_hash(method)
+        cached = self.rendered.get(key)
+        if cached is not None and cached[0] == content_hash:
+            self.rendered.move_to_end(key)
+            metrics.BOT_API_SKIPPED_EDITS.inc()
+            return cached[1]
+
+        self.rendered.pop(key, None)
+        result = await make_request(bot, method)
+        self._remember(key, content_hash, result)
+        return result
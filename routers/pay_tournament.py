@@ -49,8 +49,8 @@ async def paid_by_user(callback: types.CallbackQuery, session: Any, bot: Bot) ->
     team: TeamUsers = await AsyncOrm.get_team(team_id, session)
     user: User = await AsyncOrm.get_user_by_tg_id(tg_id)
 
-    # Создание платежа в БД
-    await AsyncOrm.create_tournament_payment(team_id, tournament_id, session)
+    # Создание платежа в БД, при повторном нажатии платеж уже есть и админ его уже получил
+    created = await AsyncOrm.create_tournament_payment(team_id, tournament_id, session)
 
     # Сообщение пользователю
     msg = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
@@ -63,6 +63,9 @@ async def paid_by_user(callback: types.CallbackQuery, session: Any, bot: Bot) ->
     await callback.message.edit_text(msg, reply_markup=keyboard.as_markup())
 
     # Сообщение админу
+    if not created:
+        return
+
     date = convert_date(tournament.date)
     time = convert_time(tournament.date)
     admin_msg = f"Капитан команды \"{team.title}\" <a href='tg://user?id={user.tg_id}'>{user.firstname} {user.lastname}</a> " \
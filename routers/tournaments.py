@@ -461,13 +461,10 @@ async def delete_team_from_tournament(callback: types.CallbackQuery, session: An
             # берем команду из резерва если они есть (при удалении основной команды)
             if team.reserve is False:
                 try:
-                    # получаем команду
-                    reserve_team: TeamUsers = await AsyncOrm.get_first_reserve_team(tournament_id, session)
+                    # переводим первую команду из резерва в основу
+                    reserve_team: TeamUsers | None = await AsyncOrm.transfer_first_reserve_team(tournament_id, session)
 
-                    # меняем reserve на False
                     if reserve_team:
-                        await AsyncOrm.transfer_team_from_reserve(reserve_team.team_id, session)
-
                         # оповещение участников команды переведенной из резерва
                         converted_date = convert_date_named_month(tournament.date)
                         msg = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
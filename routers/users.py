@@ -7,7 +7,7 @@ from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import FSInputFile
 
-from database.schemas import Tournament, Event, TeamUsers, TournamentTeams, TournamentPaid
+from database.schemas import Event, TeamUsers, TournamentTeams, TournamentPaid
 from logger import logger
 from routers.middlewares import CheckPrivateMessageMiddleware, DatabaseMiddleware
 from routers import keyboards as kb, messages as ms
@@ -287,33 +287,34 @@ async def register_paid_event(callback: types.CallbackQuery, bot: Bot) -> None:
         )
         return
 
-    # создание платежа в БД
-    await AsyncOrm.create_payments(user_id, event_id)
+    # создание платежа в БД, при повторном нажатии платеж уже есть и админ его уже получил
+    created = await AsyncOrm.create_payments(user_id, event_id)
 
-    # оповещение администратора
-    event_date = utils.convert_date(event_with_users.date)
-    event_time = utils.convert_time(event_with_users.date)
+    if created:
+        # оповещение администратора
+        event_date = utils.convert_date(event_with_users.date)
+        event_time = utils.convert_time(event_with_users.date)
 
-    if to_reserve:
-        msg_to_admin = f"Пользователь <a href='tg://user?id={user.tg_id}'>{user.firstname} {user.lastname}</a> " \
-                       f"оплатил <b>запись в резерв</b> события <b>{event_with_users.type}</b> \"{event_with_users.title}\" <b>{event_date} {event_time}</b> " \
-                       f"на сумму <b>{event_with_users.price} руб.</b> \n\nПодтвердите или отклоните оплату"
-    else:
-        msg_to_admin = f"Пользователь <a href='tg://user?id={user.tg_id}'>{user.firstname} {user.lastname}</a> " \
-                       f"оплатил <b>{event_with_users.type}</b> \"{event_with_users.title}\" <b>{event_date} {event_time}</b> " \
-                       f"на сумму <b>{event_with_users.price} руб.</b> \n\nПодтвердите или отклоните оплату"
+        if to_reserve:
+            msg_to_admin = f"Пользователь <a href='tg://user?id={user.tg_id}'>{user.firstname} {user.lastname}</a> " \
+                           f"оплатил <b>запись в резерв</b> события <b>{event_with_users.type}</b> \"{event_with_users.title}\" <b>{event_date} {event_time}</b> " \
+                           f"на сумму <b>{event_with_users.price} руб.</b> \n\nПодтвердите или отклоните оплату"
+        else:
+            msg_to_admin = f"Пользователь <a href='tg://user?id={user.tg_id}'>{user.firstname} {user.lastname}</a> " \
+                           f"оплатил <b>{event_with_users.type}</b> \"{event_with_users.title}\" <b>{event_date} {event_time}</b> " \
+                           f"на сумму <b>{event_with_users.price} руб.</b> \n\nПодтвердите или отклоните оплату"
 
-    # формирование клавиатуры для подтверждения оплаты в резерв или основу
-    if to_reserve:
-        reply_markup = kb.confirm_decline_keyboard(event_id, user_id, to_reserve=True)
-    else:
-        reply_markup = kb.confirm_decline_keyboard(event_id, user_id)
+        # формирование клавиатуры для подтверждения оплаты в резерв или основу
+        if to_reserve:
+            reply_markup = kb.confirm_decline_keyboard(event_id, user_id, to_reserve=True)
+        else:
+            reply_markup = kb.confirm_decline_keyboard(event_id, user_id)
 
-    await bot.send_message(
-        settings.settings.main_admin_tg_id,
-        msg_to_admin,
-        reply_markup=reply_markup.as_markup()
-    )
+        await bot.send_message(
+            settings.settings.main_admin_tg_id,
+            msg_to_admin,
+            reply_markup=reply_markup.as_markup()
+        )
 
     # формирование текста ответу пользователю об ожидании подтверждения оплаты
     if to_reserve:
@@ -336,30 +337,10 @@ async def register_paid_event(callback: types.CallbackQuery, bot: Bot) -> None:
 @router.callback_query(lambda callback: callback.data.split("_")[1] == "my-events")
 async def user_event_registered_handler(callback: types.CallbackQuery, session: Any) -> None:
     """Вывод мероприятий куда пользователь уже зарегистрирован"""
-    tg_id = str(callback.from_user.id)
-    user = await AsyncOrm.get_user_by_tg_id(tg_id)
-
-    # все мероприятия кроме турниров
-    payments = await AsyncOrm.get_user_payments_with_events_and_users(str(callback.from_user.id))
-    active_events = list(filter(lambda payment: payment.event.active == True, payments))
-
-    # Турниры
-    tournaments: list[Tournament] = await AsyncOrm.get_tournament_for_user(user.id, session)
-    active_events.extend(tournaments)
-
-    if active_events:
-        all_events = sorted(active_events, key=lambda e: e.date if type(e) == Tournament else e.event.date)
-    else:
-        all_events = []
+    # события, резервы и турниры одним запросом, уже отсортированы по дате
+    my_events = await AsyncOrm.get_my_events(str(callback.from_user.id), session)
 
-    # получение зарезервированных мероприятий
-    if payments:
-        user_id = payments[0].user_id
-        reserved_events = await AsyncOrm.get_reserved_events_by_user_id(user_id)
-    else:
-        reserved_events = []
-
-    if not all_events:
+    if not my_events:
         msg = "Вы пока никуда не записаны\n\nВы можете это сделать во вкладке \n\"🗓️ Все события\""
     else:
         msg = "<b>События куда вы записались:</b>\n\n" \
@@ -367,7 +348,7 @@ async def user_event_registered_handler(callback: types.CallbackQuery, session:
               "📝 - резерв на событие\n" \
               "⏳ - ожидается подтверждение оплаты от администратора"
 
-    await callback.message.edit_text(msg, reply_markup=kb.user_events(all_events, reserved_events).as_markup())
+    await callback.message.edit_text(msg, reply_markup=kb.user_events(my_events).as_markup())
 
 
 @router.callback_query(lambda callback: callback.data.split("_")[0] == "my-events")
@@ -418,7 +399,7 @@ async def unregister_form_my_event_handler(callback: types.CallbackQuery) -> Non
 
 @router.callback_query(lambda callback: callback.data.split("_")[0] == "unreg-user-confirmed"
                        or callback.data.split("_")[0] == "unreg-user-confirmed-reserve")
-async def unregister_form_my_event_handler(callback: types.CallbackQuery, bot: Bot) -> None:
+async def unregister_form_my_event_handler(callback: types.CallbackQuery, bot: Bot, session: Any) -> None:
     """Подтверждение отмены регистрации на событие в Моих мероприятиях"""
     event_id = int(callback.data.split("_")[1])
     user_id = int(callback.data.split("_")[2])
@@ -440,17 +421,9 @@ async def unregister_form_my_event_handler(callback: types.CallbackQuery, bot: B
     await callback.message.edit_text(user_msg)
 
     # возврат ко вкладке мои мероприятия
-    events = await AsyncOrm.get_user_payments_with_events_and_users(str(callback.from_user.id))
-    active_events = list(filter(lambda payment: payment.event.active == True, events))
+    my_events = await AsyncOrm.get_my_events(str(callback.from_user.id), session)
 
-    # получение зарезервированных мероприятий
-    if events:
-        user_id = events[0].user_id
-        reserved_events = await AsyncOrm.get_reserved_events_by_user_id(user_id)
-    else:
-        reserved_events = []
-
-    if not active_events:
+    if not my_events:
         msg = "Вы пока никуда не записаны\n\nВы можете это сделать во вкладке \n\"🗓️ Все события\""
     else:
         msg = "<b>События куда вы записались:</b>\n\n" \
@@ -458,16 +431,12 @@ async def unregister_form_my_event_handler(callback: types.CallbackQuery, bot: B
               "📝 - резерв на событие\n" \
               "⏳ - ожидается подтверждение оплаты от администратора"
 
-    await callback.message.answer(msg, reply_markup=kb.user_events(active_events, reserved_events).as_markup())
+    await callback.message.answer(msg, reply_markup=kb.user_events(my_events).as_markup())
 
     # добор из резерва при отмене записи из основы
     if not reserved_event:
-        users_in_reserved = await AsyncOrm.get_reserved_users_by_event_id(event.id)
-        event_has_reserve = len(users_in_reserved) > 0
-        if event_has_reserve:
-            transfered_user = users_in_reserved[0].user
-            await AsyncOrm.transfer_from_reserve_to_event(event.id, transfered_user.id)
-
+        transfered_user = await AsyncOrm.transfer_first_from_reserve_to_event(event.id)
+        if transfered_user:
             # оповещение человека записанного из резерва
             notify_msg = f"🔔 <b>Автоматическое уведомление</b>\n\n" \
                          f"Вы записаны на <b>{event.type}</b> {event.title} на " \
@@ -1,8 +1,9 @@
 from datetime import datetime
-from typing import List
+from typing import List, Sequence
 
 from database import schemas
 
+import numpy as np
 import pytz
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side
@@ -253,7 +254,64 @@ def calculate_team_points(users: List[User], libero_id: int = None) -> int:
     return team_points
 
 
+def _user_points_table() -> np.ndarray:
+    """Таблица баллов settings.user_points в виде массива [пол, уровень] (0 - male, 1 - female)"""
+    max_level = max(max(settings.user_points["male"]), max(settings.user_points["female"]))
+    table = np.zeros((2, max_level + 1), dtype=np.int64)
+    for gender_idx, gender in enumerate(("male", "female")):
+        for level, points in settings.user_points[gender].items():
+            table[gender_idx, level] = points
+    return table
 
 
-
+def calculate_teams_points(team_ids: Sequence[int],
+                           levels: Sequence[int],
+                           genders: Sequence[str],
+                           is_libero: Sequence[bool]) -> dict[int, int]:
+    """
+    Пакетный подсчет баллов для всех команд сразу (аналог calculate_team_points).
+    Каждый элемент массивов - один игрок команды team_ids[i], порядок игроков внутри команды
+    должен совпадать с порядком в TeamUsers.users.
+    """
+    team_ids = np.asarray(team_ids, dtype=np.int64)
+    levels = np.asarray(levels, dtype=np.int64)
+    genders = np.asarray(genders)
+    is_libero = np.asarray(is_libero, dtype=bool)
+
+    if team_ids.size == 0:
+        return {}
+
+    # как и в calculate_team_points, неизвестный пол - ошибка
+    is_male = genders == "male"
+    if not np.all(is_male | (genders == "female")):
+        raise KeyError("Неизвестный пол игрока")
+    points_table = _user_points_table()
+    points = points_table[np.where(is_male, 0, 1), levels]
+
+    # сортировка по команде и уровню по убыванию, стабильная как и sorted
+    levels_count = points_table.shape[1]
+    order = np.argsort(team_ids * levels_count + (levels_count - 1 - levels), kind="stable")
+    sorted_teams = team_ids[order]
+    sorted_points = points[order]
+    sorted_libero = is_libero[order]
+
+    # номер игрока внутри команды после сортировки (массив уже отсортирован по команде)
+    new_team = np.empty(sorted_teams.size, dtype=bool)
+    new_team[0] = True
+    np.not_equal(sorted_teams[1:], sorted_teams[:-1], out=new_team[1:])
+    team_starts = np.flatnonzero(new_team)
+    unique_teams = sorted_teams[team_starts]
+    team_idx = np.cumsum(new_team) - 1
+    rank = np.arange(sorted_teams.size) - team_starts[team_idx]
+
+    # баллы 6 сильнейших без либеро
+    top = rank < 6
+    team_points = np.bincount(team_idx, weights=sorted_points * (top & ~sorted_libero), minlength=unique_teams.size)
+
+    # либеро среди 6 сильнейших заменяется седьмым игроком (если он есть)
+    libero_in_top = np.bincount(team_idx, weights=top & sorted_libero, minlength=unique_teams.size)
+    seventh = rank == 6
+    team_points[team_idx[seventh]] += sorted_points[seventh] * libero_in_top[team_idx[seventh]]
+
+    return dict(zip(unique_teams.tolist(), team_points.astype(np.int64).tolist()))
 
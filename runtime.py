@@ -0,0 +1,38 @@
+import asyncio
+import json
+from typing import Any, Callable
+
+from logger import logger
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+def install_event_loop(fast: bool) -> str:
+    """Включение uvloop для asyncio.run, если он установлен. Возвращает название используемого loop"""
+    if fast and uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        return "uvloop"
+    if fast:
+        logger.warning("uvloop не установлен, используется стандартный event loop")
+    return "asyncio"
+
+
+def json_functions(fast: bool) -> tuple[Callable[..., Any], Callable[..., str]]:
+    """Функции (loads, dumps) для сессии Bot: orjson, если он установлен, иначе стандартный json"""
+    if fast and orjson is not None:
+        return orjson.loads, _orjson_dumps
+    if fast:
+        logger.warning("orjson не установлен, используется стандартный json")
+    return json.loads, json.dumps
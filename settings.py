@@ -56,11 +56,17 @@ class Database(BaseSettings):
     postgres_db: str
     postgres_host: str
     postgres_port: str
+    application_name: str = "volleyball_bot"    # по нему считаются соединения бота в pg_stat_activity
+    statement_timeout: int = 30000  # мс, ограничение на выполнение запроса из задач планировщика
 
     @property
     def DATABASE_URL(self):
         return f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
 
+    @property
+    def SYNC_DATABASE_URL(self):
+        return f"postgresql+psycopg://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -81,6 +87,34 @@ class Settings(BaseSettings):
     kick_team_without_pay_days: int = 4
     tournament_min_team_hours: int = 10
     tournament_min_users_days: int = 1
+    scheduler_misfire_grace_time: int = 3600   # сек, пропущенный запуск выполняется, если опоздание не больше
+    scheduler_coalesce: bool = True     # несколько пропущенных запусков выполняются один раз
+    scheduler_max_instances: int = 1    # задача не запускается, пока не завершился прошлый запуск
+    scheduler_pool_size: int = 4    # соединений в пуле для параллельных подзадач
+    scheduler_sub_job_timeout: int = 600    # сек, ограничение на выполнение одной подзадачи
+    db_backends_warning: int = 20   # предупреждение, если бот держит больше соединений к БД
+    bot_api_server: str | None = None   # адрес Bot API вместо api.telegram.org (например benchmarks.fake_telegram)
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9100    # 0 - не запускать /metrics
+    n_plus_one_threshold: int = 3   # предупреждение, если один запрос выполнен за апдейт больше раз
+    profile_max_updates: int = 50   # максимум апдейтов для профилирования одной командой /profile
+    loop_lag_interval: float = 0.1  # период замера задержки event loop в секундах
+    loop_lag_threshold: float = 0.5     # блокировка event loop дольше порога логируется со стеком
+    log_queue_size: int = 10000     # записи сверх очереди фоновой записи логов отбрасываются
+    log_sampling: dict[str, float] = {}     # доля INFO/DEBUG записей модуля, например {"database.orm": 0.1}
+    fast_runtime: bool = False  # uvloop и orjson для сессии Bot, если установлены
+    bot_api_connections: int = 100  # размер пула keep-alive соединений к Bot API
+    bot_api_keepalive: float = 60   # сколько секунд держать простаивающее соединение
+    bot_api_dns_ttl: int = 3600     # кэш DNS api.telegram.org в секундах
+    bot_api_timeout: float = 30     # таймаут запроса к Bot API по умолчанию
+    bot_api_connect_timeout: float = 5
+    bot_api_method_timeouts: dict[str, float] = {"SendDocument": 120, "SendPhoto": 60}   # таймауты по методам
+    bot_api_rate: float = 25    # общий лимит запросов к Bot API в секунду (у Telegram около 30 сообщений/с)
+    bot_api_burst: int = 30
+    update_concurrency: int = 50    # апдейтов одновременно, апдейты одного чата всегда по очереди (0 - без ограничений)
+    user_cache_ttl: float = 300     # сколько секунд пользователь хранится в кэше AsyncOrm.get_user_by_tg_id (0 - без кэша)
+    user_cache_size: int = 10000
+    rendered_messages_cache: int = 10000    # сколько сообщений помнить для пропуска edit_text без изменений
     db: Database = Database()
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
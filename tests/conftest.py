@@ -0,0 +1,20 @@
+import os
+
+# обязательные настройки, чтобы модули бота импортировались без .env.
+# переменные окружения важнее .env, поэтому при наличии .env (локальная БД) ничего не подставляется
+_defaults = {
+    "BOT_TOKEN": "42:TEST",
+    "ADMINS": '["1"]',
+    "MAIN_ADMIN_URL": "admin",
+    "MAIN_ADMIN_TG_ID": "1",
+    "ADMIN_PHONE": "0",
+    "SUPPORT_CONTACT": "support",
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_DB": "postgres",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+}
+if not os.path.exists(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")):
+    for name, value in _defaults.items():
+        os.environ.setdefault(name, value)
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from aiogram.methods import AnswerCallbackQuery, SendMessage
+
+import outbound
+from settings import settings
+
+
+@pytest.fixture(autouse=True)
+def admin_chats(monkeypatch):
+    monkeypatch.setattr(settings, "admins", ["10"])
+    monkeypatch.setattr(settings, "main_admin_tg_id", "20")
+
+
+def send(chat_id: int) -> SendMessage:
+    return SendMessage(chat_id=chat_id, text="test")
+
+
+def test_classify_by_recipient():
+    with outbound.update_chat(100):
+        assert outbound.classify(send(100)) == outbound.INTERACTIVE
+        assert outbound.classify(AnswerCallbackQuery(callback_query_id="1")) == outbound.INTERACTIVE
+        assert outbound.classify(send(10)) == outbound.ADMIN
+        # главный админ получает подтверждения оплат, даже если его нет в ADMINS
+        assert outbound.classify(send(20)) == outbound.ADMIN
+        assert outbound.classify(send(200)) == outbound.BULK
+
+
+def test_job_default_priority_keeps_admin_alerts():
+    with outbound.default_priority(outbound.BULK):
+        assert outbound.classify(send(200)) == outbound.BULK
+        assert outbound.classify(AnswerCallbackQuery(callback_query_id="1")) == outbound.BULK
+        assert outbound.classify(send(20)) == outbound.ADMIN
+        assert outbound.classify(send(10)) == outbound.ADMIN
+
+
+def test_limiter_serves_higher_priority_first():
+    async def run() -> list[int]:
+        limiter = outbound.PriorityRateLimiter(rate=100, burst=1)
+        await limiter.acquire(outbound.BULK)  # свободный токен израсходован, дальше очередь
+        served = []
+
+        async def request(priority: int) -> None:
+            await limiter.acquire(priority)
+            served.append(priority)
+
+        await asyncio.gather(*(request(priority) for priority in
+                               (outbound.BULK, outbound.BULK, outbound.ADMIN, outbound.INTERACTIVE)))
+        return served
+
+    assert asyncio.run(run()) == [outbound.INTERACTIVE, outbound.ADMIN, outbound.BULK, outbound.BULK]
@@ -0,0 +1,42 @@
+import asyncio
+
+import asyncpg
+import pytest
+
+from benchmarks import query_plans
+from database.database import async_engine
+from settings import settings
+
+
+async def postgres_available() -> bool:
+    try:
+        conn = await asyncpg.connect(
+            user=settings.db.postgres_user,
+            host=settings.db.postgres_host,
+            password=settings.db.postgres_password,
+            port=settings.db.postgres_port,
+            database=settings.db.postgres_db,
+            timeout=3,
+        )
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+        return False
+    await conn.close()
+    return True
+
+
+def test_hot_query_plans():
+    """Нет Seq Scan по большим таблицам и планы в бюджете (данные - benchmarks.generate_data)"""
+    async def run() -> list[str]:
+        if not await postgres_available():
+            pytest.skip("Postgres из настроек недоступен")
+        try:
+            return await query_plans.find_violations(query_plans.LARGE_ROWS, query_plans.MAX_COST)
+        except asyncpg.UndefinedTableError:
+            pytest.skip("в БД нет схемы бота (alembic upgrade head)")
+        except SystemExit as e:
+            pytest.skip(str(e))
+        finally:
+            await async_engine.dispose()
+
+    violations = asyncio.run(run())
+    assert not violations, "\n".join(violations)
@@ -0,0 +1,70 @@
+import asyncio
+import datetime
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.filters import StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Chat, Message, Update, User
+
+from update_isolation import ChatEventIsolation
+
+
+class S(StatesGroup):
+    a = State()
+
+
+def message_update(update_id: int, chat_id: int, text: str) -> Update:
+    return Update(update_id=update_id, message=Message(
+        message_id=update_id, date=datetime.datetime.now(), text=text,
+        chat=Chat(id=chat_id, type="private"), from_user=User(id=chat_id, is_bot=False, first_name="test"),
+    ))
+
+
+def create_dispatcher(isolation: ChatEventIsolation, handled: list, delay: float = 0.01) -> Dispatcher:
+    router = Router()
+
+    @router.message(StateFilter(None))
+    async def no_state(message: Message, state: FSMContext) -> None:
+        await asyncio.sleep(delay)
+        await state.set_state(S.a)
+        handled.append(("none", message.text))
+
+    @router.message(S.a)
+    async def state_a(message: Message, state: FSMContext) -> None:
+        await asyncio.sleep(delay)
+        await state.clear()
+        handled.append(("a", message.text))
+
+    dispatcher = Dispatcher(storage=MemoryStorage(), events_isolation=isolation)
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+def test_second_update_sees_state_of_first():
+    async def run() -> list:
+        handled = []
+        isolation = ChatEventIsolation(concurrency=10)
+        dispatcher = create_dispatcher(isolation, handled)
+        bot = Bot("42:TEST")
+        await asyncio.gather(*(dispatcher.feed_update(bot, message_update(i, 100, text))
+                               for i, text in enumerate(("one", "two", "three"))))
+        assert not isolation.chats
+        return handled
+
+    assert asyncio.run(run()) == [("none", "one"), ("a", "two"), ("none", "three")]
+
+
+def test_chats_run_in_parallel_up_to_concurrency():
+    async def run() -> float:
+        handled = []
+        dispatcher = create_dispatcher(ChatEventIsolation(concurrency=2), handled, delay=0.1)
+        bot = Bot("42:TEST")
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(dispatcher.feed_update(bot, message_update(i, 100 + i, "one")) for i in range(4)))
+        assert len(handled) == 4
+        return asyncio.get_running_loop().time() - start
+
+    # 4 чата по 0.1 с, по 2 одновременно
+    assert 0.2 <= asyncio.run(run()) < 0.35
@@ -0,0 +1,64 @@
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+import metrics
+
+
+class ChatEventIsolation(BaseEventIsolation):
+    """Апдейты одного чата обрабатываются по очереди, разных чатов - параллельно, не больше concurrency одновременно.
+
+    Передается в Dispatcher(events_isolation=...): FSMContextMiddleware берет блокировку до чтения состояния,
+    поэтому следующий апдейт чата видит состояние, установленное предыдущим (например шаги добавления события).
+    До блокировки нет ожиданий, поэтому задачи апдейтов встают в очередь чата в порядке получения"""
+    def __init__(self, concurrency: int = 0):
+        # 0 - без общего ограничения
+        self.semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        # блокировка чата и количество его апдейтов в обработке или ожидании, удаляется когда их не осталось
+        self.chats: dict[tuple[int, int], tuple[asyncio.Lock, int]] = {}
+
+    def _enter(self, chat_key: tuple[int, int]) -> asyncio.Lock:
+        lock, count = self.chats.get(chat_key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self.chats[chat_key] = (lock, count + 1)
+        return lock
+
+    def _leave(self, chat_key: tuple[int, int]) -> None:
+        lock, count = self.chats[chat_key]
+        if count <= 1:
+            del self.chats[chat_key]
+        else:
+            self.chats[chat_key] = (lock, count - 1)
+
+    @contextlib.asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncIterator[None]:
+        # ключ FSM разделяет пользователей и топики, очередь общая на весь чат
+        chat_key = (key.bot_id, key.chat_id)
+        lock = self._enter(chat_key)
+        metrics.UPDATE_CHATS.set(len(self.chats))
+        metrics.UPDATES_WAITING.inc()
+        waiting = True
+        start = time.perf_counter()
+        try:
+            async with lock:
+                async with self.semaphore or contextlib.nullcontext():
+                    metrics.UPDATES_WAITING.dec()
+                    waiting = False
+                    metrics.UPDATE_QUEUE_WAIT.observe(time.perf_counter() - start)
+                    metrics.UPDATES_ACTIVE.inc()
+                    try:
+                        yield
+                    finally:
+                        metrics.UPDATES_ACTIVE.dec()
+        finally:
+            if waiting:
+                metrics.UPDATES_WAITING.dec()
+            self._leave(chat_key)
+            metrics.UPDATE_CHATS.set(len(self.chats))
+
+    async def close(self) -> None:
+        self.chats.clear()